@@ -2,7 +2,7 @@
 
 This module contains the classes used for a black jack game.
 
-The ruleset used is Vegas Strip Blackjack:
+The default ruleset is Vegas Strip Blackjack:
 
 - Dealer stands on soft 17
 - Blackjack pays 3:2
@@ -14,9 +14,15 @@ The ruleset used is Vegas Strip Blackjack:
 - 21 on split Aces does not count as Blackjack
 - Player may split unlike 10-value cards
 
+Other variations are played by giving the Dealer and Player a
+blackjack_rules.Rules object.
+
 """
 
-from random import shuffle
+from random import Random
+
+import blackjack_handstate as handstate
+from blackjack_rules import VEGAS_STRIP
 
 
 class Card():
@@ -37,11 +43,21 @@ class Card():
 
 class CardDeck():
 
-    """A deck of cards that containing six sets of 52 unique cards
+    """A deck of cards that containing six (or the given number of) sets of
+    52 unique cards
 
     can be shuffled, and cards can be removed from it to be dealt to
     a player or the dealer.
 
+    The deck is held as a bytearray of card codes, an index into the 52
+    unique Card objects shared by every deck, so a shoe is a single 312
+    byte buffer that is refilled and shuffled in place.
+
+    A cut card is placed so that the given fraction of the shoe (its
+    penetration) is dealt before it needs shuffling. In continuous mode the
+    deck acts as a continuous shuffling machine instead, and the cards dealt
+    in a round go back into it at random places once the round is over.
+
     """
 
     suits = ['clubs', 'diamonds', 'hearts', 'spades']
@@ -60,23 +76,59 @@ class CardDeck():
         'Queen': 10,
         'King':10
         }
+    shoe = bytes(range(52)) * 6 # card codes of a full six deck shoe, in unshuffled order
+    cards = None # the 52 unique cards, built the first time a deck is made
 
 
-    def __init__(self):
+    def __init__(self, rng=None, penetration=0.75, continuous=False, decks=6):
 
-        self.deck = []
-        for _ in range(0, 6):
-            for suit in CardDeck.suits:
-                for face in CardDeck.face_value:
-                    self.deck.append(Card(f'{face} of {suit}', CardDeck.face_value[face]))
+        self.rng = rng or Random() # each deck can have its own seeded generator
+        if CardDeck.cards is None:
+            CardDeck.cards = [Card(f'{face} of {suit}', value)
+                              for suit in CardDeck.suits
+                              for face, value in CardDeck.face_value.items()]
+        self.shoe = CardDeck.shoe if decks == 6 else bytes(range(52)) * decks
+        self.deck = bytearray(self.shoe)
+        self.continuous = continuous
+        self.dealt = bytearray() # codes dealt since the last round, continuous mode only
+        # number of cards left in the deck when the cut card comes out
+        self.cut_card = round(len(self.shoe) * (1 - penetration))
+
+    def reset(self):
+        """ puts every card back in the deck, reusing the same buffer """
+        self.deck[:] = self.shoe
+        self.dealt.clear()
 
     def shuffle_cards(self):
         """ shuffle cards in deck """
-        shuffle(self.deck)
+        self.rng.shuffle(self.deck)
 
     def get_card(self):
         """ returns a card from the top of the deck """
-        return self.deck.pop()
+        code = self.deck.pop()
+        if self.continuous:
+            self.dealt.append(code)
+        return CardDeck.cards[code]
+
+    def needs_shuffle(self):
+        """ checks if the cut card has come out """
+        return len(self.deck) <= self.cut_card
+
+    def return_cards(self):
+        """ Puts the cards dealt since the last call back into the deck, each
+        at a random place, as a continuous shuffling machine does. The deck
+        stays uniformly shuffled without touching the cards already in it.
+
+        """
+
+        deck = self.deck
+        randbelow = self.rng.randrange
+        for code in self.dealt:
+            deck.append(code)
+            place = randbelow(len(deck))
+            deck[-1] = deck[place]
+            deck[place] = code
+        self.dealt.clear()
 
 class Hand():
 
@@ -88,12 +140,18 @@ class Hand():
 
     """
 
-    def __init__(self, bet):
-        """Initializes hand to a hold no cards, represented as an empty list."""
+    def __init__(self, bet, split=False):
+        """Initializes hand to a hold no cards, represented as an empty list.
+        Hands created by a split can't be blackjack.
+
+        """
         self.cards = []
         self._bet = bet
-        self.is_soft = False # tracks whether an ace is counted as 11
-        self.value = 0
+        # total, soft ace, pair and split flags all live in the hand state
+        self.state = handstate.SPLIT_EMPTY if split else handstate.EMPTY
+        self.surrendered = False
+        self._cards_text = None # rendered cards and value, until the cards change
+        self._text = None # rendered hand, until the cards or the bet change
 
     def add_card(self, card):
         """adds a card received from the dealer to the hand and calculates
@@ -103,37 +161,59 @@ class Hand():
 
         self.cards.append(card)
         self.add_to_value(card)
+        self._cards_text = self._text = None
 
     def add_to_value(self, card):
-        """ adds the value of a card whenever a new card
-        is added to the hand. Keeps track of whether a hand is
-        counting an ace as 11 and adjust accordingly. 
-        
+        """ moves the hand to its next state whenever a new card is added,
+        which keeps track of the total and of whether an ace is counted
+        as 11.
+
         """
 
-        if card.value == 1:
-            if self.value >= 11:
-                self.value += 1
-            else:
-                self.value += 11
-                self.is_soft = True
-        else:
-            self.value += card.value
-            if self.is_bust() and self.is_soft:
-                self.value -= 10
-                self.is_soft = False
+        self.state = handstate.TRANSITIONS[self.state * 11 + card.value]
 
-    def is_blackjack(self):
-        """checks if hand is blackjack"""
+    def clear(self):
+        """ removes all cards from the hand """
+        self.cards.clear()
+        self.state = handstate.EMPTY
+        self.surrendered = False
+        self._cards_text = self._text = None
+
+    def split_off(self):
+        """ removes the second card of a pair, leaving a split hand holding
+        only the first card.
+
+        OUTPUT: the removed card
+
+        """
+
+        card = self.cards.pop(1)
+        self.state = handstate.next_state(handstate.SPLIT_EMPTY, self.cards[0].value)
+        self._cards_text = self._text = None
+        return card
 
-        card_one_value = self.cards[0].value
-        card_two_value = self.cards[1].value
+    @property
+    def value(self):
+        """ total value of the cards in the hand """
+        return handstate.TOTAL[self.state]
 
-        return (card_one_value == 1 and card_two_value == 10) or (card_one_value == 10 and card_two_value == 1)
+    @property
+    def is_soft(self):
+        """ whether an ace is counted as 11 """
+        return handstate.SOFT[self.state]
+
+    @property
+    def is_split(self):
+        """ whether the hand was created by a split """
+        return handstate.SPLIT[self.state]
+
+    def is_blackjack(self):
+        """checks if hand is blackjack, 21 on a split hand does not count"""
+        return self.state & handstate.BLACKJACK == handstate.BLACKJACK
 
     def is_bust(self):
         """ checks if value is more than 21 """
-        return self.value > 21
+        return self.state & handstate.BUST == handstate.BUST
 
     def is_splitable(self):
         """ If the hand only has two cards and those cards are of the same
@@ -143,11 +223,7 @@ class Hand():
 
         """
 
-        card_one = self.cards[0]
-        card_two = self.cards[1]
-        if len(self.cards) == 2:
-            return card_one.value == card_two.value
-        return False
+        return handstate.PAIR[self.state]
 
     @property
     def bet(self):
@@ -158,6 +234,18 @@ class Hand():
     def bet(self, amount):
         """ set the bet amount for the current hand """
         self._bet = amount
+        self._text = None
+
+    def cards_text(self):
+        """ The cards in this hand and their value, without the bet. The text
+        is only rendered again once the cards change.
+
+        """
+
+        if self._cards_text is None:
+            cards = "".join([f"{card.name} - " for card in self.cards])
+            self._cards_text = f"Cards -> {cards}\nValue of cards: {self.value}"
+        return self._cards_text
 
     def __str__(self):
         """Creates and returns a string representation of the
@@ -165,27 +253,27 @@ class Hand():
         
         """
 
-        string = f"Bet: ${self.bet}.\n"
-        string += "Cards -> "
-        for card in self.cards:
-            string += f"{card.__str__()} - "
-        string += f"\nValue of cards: {self.value}"
-        return string
+        if self._text is None:
+            self._text = f"Bet: ${self._bet}.\n{self.cards_text()}"
+        return self._text
 
 class Player():
     """
     A player has one or several hands containing cards and has a wallet of money.
 
-    They can place a bet, split on a pair, double down, stand or hit.
+    They can place a bet, split on a pair, double down, surrender, stand or hit,
+    as far as the table's rules allow.
 
     """
 
-    def __init__(self):
+    def __init__(self, rules=None):
 
         self.hands = []
         self.index_curr_hand = 0
         self.curr_hand = None
         self.wallet = 100
+        self.bet_hook = None # optional callable that adjusts each bet, e.g. a count based spread
+        self.rules = rules or VEGAS_STRIP
 
     def set_next_hand(self):
         """ Changes the players current hand to the next hand """
@@ -194,7 +282,12 @@ class Player():
         self.curr_hand = self.hands[self.index_curr_hand]
             
     def place_bet(self, amount):
-        """Places a bet and creates a hand"""
+        """Places a bet and creates a hand. If a bet hook is set it is
+        given the amount and returns the amount actually bet.
+
+        """
+        if self.bet_hook is not None:
+            amount = self.bet_hook(amount)
         self.hands.append(Hand(amount))
         self.curr_hand = self.hands[0]
         self.wallet -= amount
@@ -222,10 +315,11 @@ class Player():
     def can_double_down(self):
         """ tests if the player can double down. Player can only double down if
         they have sufficient funds in their wallet to make the bet, and if they
-        have only 2 cards in the hand to be double down upon
+        have only 2 cards in the hand to be double down upon, on a split hand
+        only if the rules allow doubling after a split
 
         """
-        return ((self.wallet - self.curr_hand.bet) >= 0) and (len(self.curr_hand.cards) == 2)
+        return self.rules.can_double[self.curr_hand.state] and self.wallet >= self.curr_hand.bet
 
     def double_down(self):
         """ Doubles the bet for the hand provided."""
@@ -234,32 +328,38 @@ class Player():
 
     def can_split(self):
         """ Tests if a hand can be split, and checks whether a hand has been split on an
-        Ace before. If a split ace exists the current hand can't be split
+        Ace before. If a split ace exists the current hand can't be split, nor
+        can any hand once the player holds the most hands the rules allow, nor
+        any hand whose bet the wallet can't match.
          """
-        
-        if len(self.hands) < 4:
-            if (self.curr_hand.cards[0].value == 1) and (len(self.hands) == 2):
-                return False
-            elif self.curr_hand.is_splitable():
-                return True
-            return False
-        return False
+
+        return (self.rules.can_split[len(self.hands)][self.curr_hand.cards[0].value]
+                and self.curr_hand.is_splitable() and self.wallet >= self.curr_hand.bet)
 
     def split(self):
         """ Splits the hand when holding pairs to create a new hand """
 
-        if len(self.hands) < 4:
-            new_hand = Hand(self.curr_hand.bet) # makes new hand
-            # decrements value of current hand by value of card to be removed
-            self.curr_hand.value -= self.curr_hand.cards[1].value
+        if len(self.hands) < self.rules.max_hands:
+            new_hand = Hand(self.curr_hand.bet, split=True) # makes new hand
             # removes card from current hand putting it in new hand
             # adding its value to the hands value
-            new_hand.add_card(self.curr_hand.cards.pop(1))
+            new_hand.add_card(self.curr_hand.split_off())
             self.hands.append(new_hand)
             self.wallet -= new_hand.bet
 
         else:
-            print("Cannot split more than 3 times per game.")
+            print(f"Cannot split more than {self.rules.max_hands - 1} times per game.")
+
+    def can_surrender(self):
+        """ tests if the player can give up the hand for half the bet back,
+        only offered on the first two cards of an unsplit hand
+
+        """
+        return self.rules.can_surrender[self.curr_hand.state]
+
+    def surrender(self):
+        """ gives up the current hand, half the bet is returned at settlement """
+        self.curr_hand.surrendered = True
 
     def has_next_hand(self):
         """ Checks if the player has more hands to play """
@@ -274,25 +374,76 @@ class Dealer():
 
     """
 
-    def __init__(self):
+    def __init__(self, rng=None, penetration=0.75, continuous=False, rules=None):
         self.curr_hand = Hand(0)
         self.deck = None
+        self.rng = rng or Random() # shared by every deck this dealer uses
+        self.penetration = penetration # fraction of the shoe dealt before the cut card
+        self.continuous = continuous # use a continuous shuffling machine
+        self.rules = rules or VEGAS_STRIP
+        # objects told about every card dealt and every shuffle, see add_observer()
+        self.observers = []
 
     def deal_card(self, player_dealer):
-        """ Takes card from top of deck and deals it to themselves or a player current hand """
+        """ Takes card from top of deck and deals it to themselves or a player current hand.
+        If the deck runs out in the middle of a round a new one is brought in.
 
+        """
+
+        if not self.deck.deck:
+            self.new_deck()
         card = self.deck.get_card()
         player_dealer.curr_hand.add_card(card)
+        for observer in self.observers:
+            observer.card_dealt(card, player_dealer)
+
+    def add_observer(self, observer):
+        """ Registers an object to be told about the cards dealt. It must have
+        a card_dealt(card, player_dealer) method, called for every card dealt
+        with the player or dealer receiving it, and a shuffled(deck) method,
+        called after every shuffle.
+
+        """
+
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        """ stops telling an observer added with add_observer() about the cards dealt """
+        self.observers.remove(observer)
 
     def new_deck(self):
-        """ Gets a new deck and shuffles it"""
+        """ Gets a new deck and shuffles it, reusing the current deck if there is one """
 
-        self.deck = CardDeck()
+        if self.deck is None:
+            self.deck = CardDeck(self.rng, self.penetration, self.continuous, self.rules.decks)
+        else:
+            self.deck.reset()
         self.shuffle()
 
+    def end_round(self):
+        """ Called once the cards of a round are settled. A continuous
+        shuffling machine gets the round's cards back, otherwise the deck is
+        reshuffled if the cut card has come out.
+
+        OUTPUT: True if the deck was reshuffled
+
+        """
+
+        if self.deck.continuous:
+            self.deck.return_cards()
+            for observer in self.observers:
+                observer.shuffled(self.deck)
+            return False
+        if self.deck.needs_shuffle():
+            self.new_deck()
+            return True
+        return False
+
     def shuffle(self):
         """shuffle a deck of cards"""
         self.deck.shuffle_cards()
+        for observer in self.observers:
+            observer.shuffled(self.deck)
 
     def has_blackjack(self):
         """ If face up card is an ace then dealer peeks to see if they have blackjack. """
@@ -301,9 +452,15 @@ class Dealer():
             return self.curr_hand.is_blackjack()
         return False
 
+    def should_hit(self):
+        """ Dealer draws to 17 and stands on all 17s, including soft 17
+        unless the rules say the dealer hits soft 17
+
+        """
+
+        return self.rules.dealer_hits[self.curr_hand.state]
 
     def discard_hand(self):
         """ removes all cards from his hand """
         
-        self.curr_hand.cards.clear()
-        self.curr_hand.value = 0
+        self.curr_hand.clear()
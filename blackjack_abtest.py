@@ -0,0 +1,206 @@
+""" Paired strategy comparison with common random numbers
+
+Compares two strategies by letting both play exactly the same cards. The
+shoes come from one seeded CardDeck stream, and every round is dealt to
+strategy A and to strategy B from the same place in the same shoe, so both
+get the same opening hands, upcards and hole cards. Luck of the deal is
+shared and cancels out of the difference between them, and small
+differences in expected value are resolved in a fraction of the rounds
+that two independent runs would need.
+
+The two strategies may use up different numbers of cards in a round, as
+they hit and split differently. Both carry on from the furthest point
+either reached, so the side that drew fewer cards loses the rest of them
+unseen, as burn cards. That changes neither side's odds, and count based
+bets and decisions still follow the shoe through to the cut card.
+Observers such as a CountTracker attach to the dealer of each side as
+usual:
+
+    dealers = (blackjack.Dealer(penetration=0.8), blackjack.Dealer(penetration=0.8))
+    players = (blackjack.Player(), blackjack.Player())
+    CountTracker(spread=[(2, 4), (4, 8)]).attach(dealers[0], players[0])
+    result = compare(basic_strategy, basic_strategy, 100000, penetration=0.8,
+                     dealers=dealers, players=players)
+
+    python blackjack_abtest.py 100000 basic dealer --seed 1
+
+"""
+
+from random import Random
+
+import blackjack
+from blackjack_rules import VEGAS_STRIP
+from blackjack_sim import CHECK_ROUNDS, SimulationResult, play_round
+from blackjack_stats import RunningStats
+
+MIN_CARDS_AT_CUT = 26 # cards left behind the cut card, so no round runs out of shoe
+
+
+class PairedResult():
+    """Results of two strategies over the same rounds.
+
+    Amounts are from the player's point of view, so a positive difference
+    means strategy A wins more than strategy B.
+
+    """
+
+    def __init__(self):
+        self.a = SimulationResult()
+        self.b = SimulationResult()
+        self.net_a = RunningStats() # net of each side per round, in base bets
+        self.net_b = RunningStats()
+        self.difference = RunningStats() # net of A minus net of B per round, in base bets
+
+    def merge(self, other):
+        """ adds the rounds of another PairedResult to this one """
+        self.a.merge(other.a)
+        self.b.merge(other.b)
+        self.net_a.merge(other.net_a)
+        self.net_b.merge(other.net_b)
+        self.difference.merge(other.difference)
+        return self
+
+    @property
+    def rounds(self):
+        """ number of rounds both strategies played """
+        return self.difference.count
+
+    @property
+    def mean_difference(self):
+        """ paired difference in net result per round, in base bets """
+        return self.difference.mean
+
+    @property
+    def std_error(self):
+        """ standard error of mean_difference """
+        return self.difference.std_error
+
+    @property
+    def independent_std_error(self):
+        """ standard error the difference would have from two independent runs
+        of the same length
+
+        """
+
+        return (self.net_a.std_error ** 2 + self.net_b.std_error ** 2) ** 0.5
+
+    def __str__(self):
+        string = f"Rounds: {self.rounds}\n"
+        string += f"House edge A: {self.a.house_edge:.4%}\n"
+        string += f"House edge B: {self.b.house_edge:.4%}\n"
+        string += f"Paired difference A - B per round: {self.mean_difference:+.4%}"
+        string += f" +/- {self.std_error:.4%} (standard error)\n"
+        if self.std_error:
+            ratio = (self.independent_std_error / self.std_error) ** 2
+            string += f"Independent runs would need {ratio:.1f}x the rounds for the same precision\n"
+        return string
+
+
+def shoe_stream(seed=None, rules=None, penetration=0.75):
+    """ Shuffles shoe after shoe from one seeded CardDeck.
+
+    OUTPUT: generator of the card codes of each shuffled shoe, dealt from
+    the end as CardDeck.get_card() does
+
+    """
+
+    rules = rules or VEGAS_STRIP
+    deck = blackjack.CardDeck(Random(seed), penetration, decks=rules.decks)
+    while True:
+        deck.reset()
+        deck.shuffle_cards()
+        yield bytes(deck.deck)
+
+def compare(strategy_a, strategy_b, rounds, bet=1, seed=None, rules=None, penetration=0.75,
+            dealers=None, players=None, precision=None, confidence=0.95):
+    """ Plays two strategies over the same rounds.
+
+    With a precision the comparison stops at the first check after the
+    confidence interval on the paired difference has become no wider than it.
+
+    A dealer that runs out of cards mid round would fetch a new shoe from
+    its own generator and the two sides would no longer see the same cards,
+    so the cut card must leave at least MIN_CARDS_AT_CUT cards behind it.
+    Dealers and players passed in must have been made with the same rules
+    and penetration as the comparison, or a ValueError is raised.
+
+    INPUT: the two strategy callables, number of rounds, opening bet, seed
+    of the shoe stream, blackjack_rules.Rules, fraction of each shoe dealt
+    before the cut card, optional (dealer A, dealer B) and (player A,
+    player B) pairs to play with, optional width of confidence interval to
+    stop at, its confidence level
+    OUTPUT: PairedResult
+
+    """
+
+    rules = rules or VEGAS_STRIP
+    if round(len(rules.shoe) * (1 - penetration)) < MIN_CARDS_AT_CUT:
+        raise ValueError(f"a penetration of {penetration} leaves fewer than {MIN_CARDS_AT_CUT} "
+                         f"cards behind the cut card of a {rules.decks} deck shoe")
+    dealers = dealers or (blackjack.Dealer(Random(seed), penetration, rules=rules),
+                          blackjack.Dealer(Random(seed), penetration, rules=rules))
+    players = players or (blackjack.Player(dealers[0].rules), blackjack.Player(dealers[1].rules))
+    for side in dealers + players:
+        if side.rules.options() != rules.options():
+            raise ValueError(f"a side plays under {side.rules}, not the compared rules {rules}")
+    for dealer in dealers:
+        if dealer.penetration != penetration:
+            raise ValueError(f"a dealer cuts at a penetration of {dealer.penetration}, "
+                             f"not the compared {penetration}")
+        if dealer.deck is None:
+            dealer.new_deck()
+
+    result = PairedResult()
+    sides = ((dealers[0], players[0], strategy_a, result.a),
+             (dealers[1], players[1], strategy_b, result.b))
+    shoes = shoe_stream(seed, rules, penetration)
+    decks = [dealer.deck for dealer in dealers]
+    for played in range(rounds):
+        if not played or decks[0].needs_shuffle():
+            shoe = next(shoes)
+            for dealer in dealers:
+                dealer.deck.deck[:] = shoe
+                for observer in dealer.observers:
+                    observer.shuffled(dealer.deck)
+
+        before = len(decks[0].deck)
+        net_a, net_b = [play_round(dealer, player, strategy, bet, result=side_result)[2]
+                        for dealer, player, strategy, side_result in sides]
+        if any(len(deck.deck) > before for deck in decks): # a new shoe was brought in
+            raise RuntimeError("a shoe ran out mid round, the two sides no longer share their cards")
+        # both go on from the furthest card dealt, the other side burns the rest
+        left = min(len(deck.deck) for deck in decks)
+        for deck in decks:
+            del deck.deck[left:]
+
+        result.net_a.add(net_a / bet)
+        result.net_b.add(net_b / bet)
+        result.difference.add((net_a - net_b) / bet)
+        if (precision is not None and (played + 1) % CHECK_ROUNDS == 0
+                and 2 * result.difference.half_width(confidence) <= precision):
+            break
+    return result
+
+def main():
+    """ Command line entry point for comparing two strategies """
+
+    import argparse
+
+    from blackjack_sim import STRATEGIES
+
+    parser = argparse.ArgumentParser(description="Compare two strategies over the same shoes.")
+    parser.add_argument('rounds', type=int, help="number of rounds, at most when --precision is given")
+    parser.add_argument('a', choices=STRATEGIES, help="strategy A")
+    parser.add_argument('b', choices=STRATEGIES, help="strategy B")
+    parser.add_argument('--bet', type=int, default=1)
+    parser.add_argument('--seed', type=int, help="seed of the shoe stream")
+    parser.add_argument('--penetration', type=float, default=0.75)
+    parser.add_argument('--precision', type=float,
+                        help="stop once the confidence interval on the difference is this wide")
+    args = parser.parse_args()
+
+    print(compare(STRATEGIES[args.a], STRATEGIES[args.b], args.rounds, args.bet, args.seed,
+                  penetration=args.penetration, precision=args.precision))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+""" Bankroll and risk of ruin simulator
+
+Follows many independent players from the same starting wallet as they
+play round after round with a strategy and a betting system, until they
+can no longer cover the minimum bet or reach the session limit. Reports
+the risk of ruin, how long sessions last and how the final bankrolls are
+spread.
+
+Rounds are played with blackjack_vector, so every round of a batch of
+players is dealt and settled at once, and players are processed one batch
+at a time. Only histograms are kept between batches, so memory stays
+bounded however many players are simulated. Doubling down follows
+Player.can_double_down(): a player whose wallet can't cover a second bet
+plays on without doubling. As in blackjack_vector, pairs are played as
+their total.
+
+    python blackjack_bankroll.py 100000 --strategy basic dealer --system martingale
+
+This module needs NumPy.
+
+"""
+
+import argparse
+
+import numpy as np
+
+import blackjack_sim
+import blackjack_vector
+from blackjack_rules import Rules
+
+
+def flat(unit):
+    """ betting system that always bets one unit """
+
+    def bets(bankroll, last_bet, last_net):
+        return np.full(len(bankroll), unit, dtype=np.float64)
+    return bets
+
+def martingale(unit):
+    """ betting system that doubles the bet after every loss and goes back
+    to one unit after a win or a push
+
+    """
+
+    def bets(bankroll, last_bet, last_net):
+        return np.where(last_net < 0, last_bet * 2, unit).astype(np.float64)
+    return bets
+
+def proportional(unit, fraction=0.02):
+    """ betting system that bets a fixed fraction of the bankroll, in whole units """
+
+    def bets(bankroll, last_bet, last_net):
+        return np.maximum(np.floor(bankroll * fraction / unit), 1) * unit
+    return bets
+
+SYSTEMS = {
+    'flat': flat,
+    'martingale': martingale,
+    'proportional': proportional,
+    }
+
+
+class BankrollResult():
+    """Risk of ruin, session lengths and final bankrolls of many players.
+
+    Session lengths and final bankrolls are kept as histograms, so results
+    of any size take a bounded amount of memory and can be merged.
+
+    """
+
+    def __init__(self, max_rounds):
+        self.players = 0
+        self.ruined = 0
+        self.lengths = np.zeros(max_rounds + 1, dtype=np.int64) # rounds played -> players
+        self.bankrolls = {} # final bankroll -> players
+
+    def add_batch(self, lengths, ruined, bankrolls):
+        """ records the players of one batch """
+
+        self.players += len(lengths)
+        self.ruined += int(ruined.sum())
+        self.lengths += np.bincount(lengths, minlength=len(self.lengths))
+        values, counts = np.unique(bankrolls, return_counts=True)
+        for value, count in zip(values.tolist(), counts.tolist()):
+            self.bankrolls[value] = self.bankrolls.get(value, 0) + count
+
+    def merge(self, other):
+        """ adds the players of another BankrollResult to this one """
+
+        self.players += other.players
+        self.ruined += other.ruined
+        self.lengths += other.lengths
+        for value, count in other.bankrolls.items():
+            self.bankrolls[value] = self.bankrolls.get(value, 0) + count
+        return self
+
+    @property
+    def risk_of_ruin(self):
+        """ fraction of players who went broke """
+        return self.ruined / self.players if self.players else 0.0
+
+    def length_quantile(self, q):
+        """ number of rounds by which a fraction q of the sessions had ended """
+        cumulative = np.cumsum(self.lengths)
+        return int(np.searchsorted(cumulative, q * self.players))
+
+    def bankroll_quantile(self, q):
+        """ final bankroll below which a fraction q of the players ended """
+
+        values = sorted(self.bankrolls)
+        cumulative = np.cumsum([self.bankrolls[value] for value in values])
+        return values[min(int(np.searchsorted(cumulative, q * self.players)), len(values) - 1)]
+
+    @property
+    def mean_bankroll(self):
+        """ average final bankroll """
+        if not self.players:
+            return 0.0
+        return sum(value * count for value, count in self.bankrolls.items()) / self.players
+
+    def __str__(self):
+        string = f"Players: {self.players}\n"
+        string += f"Risk of ruin: {self.risk_of_ruin:.4%}\n"
+        string += f"Median session length: {self.length_quantile(0.5)} rounds\n"
+        string += f"Mean final bankroll: {self.mean_bankroll:.2f}\n"
+        string += "Final bankroll percentiles: "
+        string += ", ".join(f"{int(q * 100)}%: {self.bankroll_quantile(q):g}"
+                            for q in (0.05, 0.25, 0.5, 0.75, 0.95))
+        return string + "\n"
+
+
+def play_sessions(rng, players, actions, bankroll, unit, system, max_rounds, rules=None):
+    """ Plays one batch of sessions in lockstep, a round at a time.
+
+    INPUT: numpy Generator, number of players, compiled strategy, starting
+    bankroll, minimum bet, betting system, most rounds per session,
+    blackjack_rules.Rules (the Vegas Strip rules if None)
+    OUTPUT: tuple of arrays (rounds played, True if ruined, final bankroll)
+
+    """
+
+    no_double = actions.copy()
+    no_double[1] = actions[0] # the actions of hands that can't double
+    wallets = np.full(players, bankroll, dtype=np.float64)
+    lengths = np.zeros(players, dtype=np.int64)
+    last_bet = np.zeros(players)
+    last_net = np.zeros(players)
+    playing = wallets >= unit
+
+    for _ in range(max_rounds):
+        lanes = np.flatnonzero(playing)
+        if not len(lanes):
+            break
+        wallet = wallets[lanes]
+        bets = np.minimum(np.maximum(system(wallet, last_bet[lanes], last_net[lanes]), unit), wallet)
+        can_double = wallet >= 2 * bets
+        net = np.empty(len(lanes))
+        for mask, table in ((can_double, actions), (~can_double, no_double)):
+            count = int(mask.sum())
+            if count:
+                net[mask] = blackjack_vector.play_rounds(rng, count, table, rules=rules)[1]
+        net *= bets
+
+        wallets[lanes] = wallet + net
+        last_bet[lanes] = bets
+        last_net[lanes] = net
+        lengths[lanes] += 1
+        playing[lanes] = wallets[lanes] >= unit
+    return lengths, wallets < unit, wallets
+
+def simulate(strategy, players, bankroll=100, unit=1, system=None, max_rounds=1000,
+             seed=None, batch=10000, rules=None):
+    """ Simulates the sessions of many players.
+
+    INPUT: strategy callable or actions from compile_strategy(), number of
+    players, starting bankroll, minimum bet, betting system (flat bets of
+    one unit if None), most rounds per session, seed, players per batch,
+    blackjack_rules.Rules (the Vegas Strip rules if None)
+    OUTPUT: BankrollResult
+
+    """
+
+    actions = strategy if isinstance(strategy, np.ndarray) else blackjack_vector.compile_strategy(strategy)
+    system = system or flat(unit)
+    rng = np.random.default_rng(seed)
+    result = BankrollResult(max_rounds)
+    for start in range(0, players, batch):
+        result.add_batch(*play_sessions(rng, min(batch, players - start), actions,
+                                        bankroll, unit, system, max_rounds, rules))
+    return result
+
+def main():
+    """ Command line entry point for comparing strategies by risk of ruin """
+
+    parser = argparse.ArgumentParser(description="Simulate bankrolls and risk of ruin.")
+    parser.add_argument('players', type=int, help="number of independent players")
+    parser.add_argument('--strategy', nargs='+', choices=list(blackjack_sim.STRATEGIES) + ['table'],
+                        default=['basic'],
+                        help="strategies to compare, 'table' is the strategy table built for the rules")
+    parser.add_argument('--system', choices=SYSTEMS, default='flat')
+    parser.add_argument('--bankroll', type=float, default=100, help="starting wallet")
+    parser.add_argument('--bet', type=int, default=1, help="minimum bet, the betting unit")
+    parser.add_argument('--rounds', type=int, default=1000, help="most rounds per session")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--batch', type=int, default=10000, help="players simulated at once")
+    parser.add_argument('--decks', type=int, default=6)
+    parser.add_argument('--hit-soft-17', action='store_true', help="dealer hits soft 17")
+    parser.add_argument('--blackjack-pays', type=float, default=1.5, help="1.5 for 3:2, 1.2 for 6:5")
+    args = parser.parse_args()
+    rules = Rules(decks=args.decks, hit_soft_17=args.hit_soft_17, blackjack_pays=args.blackjack_pays)
+
+    for name in args.strategy:
+        if name == 'table':
+            import blackjack_strategy
+            strategy = blackjack_strategy.rules_table(rules)
+        else:
+            strategy = blackjack_sim.STRATEGIES[name]
+        result = simulate(strategy, args.players, args.bankroll, args.bet,
+                          SYSTEMS[args.system](args.bet), args.rounds, args.seed, args.batch, rules)
+        print(f"Strategy: {name}, {rules}")
+        print(result)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+""" Benchmarks for the engine's hot paths
+
+Times the core operations of the blackjack module on a fixed seed
+workload, the throughput of whole simulated rounds, the peak memory of a
+simulation and the time it takes to start a Python process that imports
+the engine. Only the standard library is used.
+
+Results can be written as JSON and compared with an earlier run, which
+lists every measurement that got slower than a threshold allows:
+
+    python blackjack_bench.py --output before.json
+    python blackjack_bench.py --compare before.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from random import Random
+from statistics import median
+from time import perf_counter, perf_counter_ns
+
+import blackjack
+import blackjack_sim
+from blackjack_settlement import settle
+
+SEED = 2024
+REPEATS = 5 # timed runs of each benchmark, the fastest is reported
+STARTUP_MODULES = ['blackjack', 'blackjack_sim', 'blackjack_gameloop']
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def bench_card_deck():
+    """ building a new six deck shoe """
+    rng = Random(SEED)
+    return lambda: blackjack.CardDeck(rng)
+
+def bench_shuffle():
+    """ shuffling a full shoe """
+    deck = blackjack.CardDeck(Random(SEED))
+    return deck.shuffle_cards
+
+def bench_add_card():
+    """ adding two cards to a hand, then clearing it """
+
+    hand = blackjack.Hand(1)
+    deck = blackjack.CardDeck(Random(SEED))
+    deck.shuffle_cards()
+    first, second = deck.get_card(), deck.get_card()
+
+    def op():
+        hand.clear()
+        hand.add_card(first)
+        hand.add_card(second)
+    return op
+
+def bench_split():
+    """ betting, receiving a pair of eights and splitting it """
+
+    player = blackjack.Player()
+    eight = blackjack.CardDeck(Random(SEED)).cards[7]
+
+    def op():
+        player.discard_hands()
+        player.wallet = 100
+        player.place_bet(1)
+        player.curr_hand.add_card(eight)
+        player.curr_hand.add_card(eight)
+        player.split()
+    return op
+
+def bench_dealer_play():
+    """ dealing the dealer two cards and drawing to 17 """
+
+    dealer = blackjack.Dealer(Random(SEED))
+    dealer.new_deck()
+
+    def op():
+        dealer.discard_hand()
+        dealer.deal_card(dealer)
+        dealer.deal_card(dealer)
+        while dealer.should_hit():
+            dealer.deal_card(dealer)
+        dealer.end_round()
+    return op
+
+def bench_settle():
+    """ settling two split hands against a dealer hand """
+
+    cards = blackjack.CardDeck(Random(SEED)).cards
+    hands = []
+    for values in ((10, 8), (10, 9)):
+        hand = blackjack.Hand(1, split=True)
+        for value in values:
+            hand.add_card(cards[value - 1])
+        hands.append(hand)
+    dealer_hand = blackjack.Hand(0)
+    for value in (10, 6, 2):
+        dealer_hand.add_card(cards[value - 1])
+    return lambda: settle(hands, dealer_hand)
+
+def bench_round():
+    """ a full round played with basic strategy, from bet to settlement """
+
+    dealer = blackjack.Dealer(Random(SEED))
+    dealer.new_deck()
+    player = blackjack.Player()
+    strategy = blackjack_sim.basic_strategy
+
+    def op():
+        blackjack_sim.play_round(dealer, player, strategy)
+        dealer.end_round()
+    return op
+
+BENCHMARKS = {
+    'card_deck': (bench_card_deck, 2000),
+    'shuffle': (bench_shuffle, 2000),
+    'hand_add_card': (bench_add_card, 200000),
+    'player_split': (bench_split, 50000),
+    'dealer_play': (bench_dealer_play, 50000),
+    'settle': (bench_settle, 200000),
+    'round': (bench_round, 20000),
+    }
+
+
+def time_op(setup, number, repeats=REPEATS):
+    """ Times a benchmark a number of times in a row, several times over.
+
+    INPUT: function building the operation to time, calls per timed run,
+    number of timed runs
+    OUTPUT: dict with the fastest and median nanoseconds per call
+
+    """
+
+    op = setup()
+    op() # warm up caches built on first use
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter_ns()
+        for _ in range(number):
+            op()
+        timings.append((perf_counter_ns() - start) / number)
+    return {'ns_per_op': min(timings), 'median_ns': median(timings)}
+
+def rounds_per_second(rounds):
+    """ throughput of blackjack_sim.simulate() with basic strategy """
+
+    start = perf_counter()
+    blackjack_sim.simulate(blackjack_sim.basic_strategy, rounds, seed=SEED)
+    return rounds / (perf_counter() - start)
+
+def peak_memory(rounds):
+    """ largest amount of memory allocated while simulating, in bytes """
+
+    tracemalloc.start()
+    try:
+        blackjack_sim.simulate(blackjack_sim.basic_strategy, rounds, seed=SEED)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def startup_time(module, repeats=REPEATS):
+    """ Time taken by a new interpreter to import a module and exit, which
+    bounds how quickly worker processes can be started.
+
+    OUTPUT: fastest time in milliseconds
+
+    """
+
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True, cwd=HERE)
+        timings.append((perf_counter() - start) * 1000)
+    return min(timings)
+
+def run_benchmarks(scale=1.0, names=None):
+    """ Runs the benchmark suite.
+
+    INPUT: factor applied to the number of calls and rounds, optional list
+    of benchmark names to run instead of all of them
+    OUTPUT: dict of results, as written by --output
+
+    """
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': SEED,
+        'operations': {},
+        }
+    for name, (setup, number) in BENCHMARKS.items():
+        if names is None or name in names:
+            results['operations'][name] = time_op(setup, max(1, int(number * scale)))
+    if names is None:
+        rounds = max(1, int(100000 * scale))
+        results['rounds_per_second'] = rounds_per_second(rounds)
+        results['peak_memory_bytes'] = peak_memory(rounds // 10)
+        results['startup_ms'] = {module: startup_time(module) for module in STARTUP_MODULES}
+    return results
+
+def flatten(results):
+    """ Flattens results into metric name -> (value, True if higher is better) """
+
+    metrics = {}
+    for name, timing in results.get('operations', {}).items():
+        metrics[f'{name} ns/op'] = (timing['ns_per_op'], False)
+    if 'rounds_per_second' in results:
+        metrics['rounds/s'] = (results['rounds_per_second'], True)
+    if 'peak_memory_bytes' in results:
+        metrics['peak memory bytes'] = (results['peak_memory_bytes'], False)
+    for module, ms in results.get('startup_ms', {}).items():
+        metrics[f'import {module} ms'] = (ms, False)
+    return metrics
+
+def compare(previous, current, threshold=0.1):
+    """ Compares two sets of results.
+
+    INPUT: results of an earlier run, results of this run, fraction a
+    measurement may get worse by before it counts as a regression
+    OUTPUT: list of (metric, previous value, current value, relative change,
+    True if regressed) for every metric in both runs, the change being
+    positive when the current run is better
+
+    """
+
+    before = flatten(previous)
+    rows = []
+    for metric, (value, higher_is_better) in flatten(current).items():
+        if metric not in before or not before[metric][0]:
+            continue
+        old = before[metric][0]
+        change = (value - old) / old if higher_is_better else (old - value) / old
+        rows.append((metric, old, value, change, change < -threshold))
+    return rows
+
+def print_results(results):
+    """ prints the results of a run as a table """
+
+    for metric, (value, _) in flatten(results).items():
+        print(f"{metric:<30} {value:>16,.1f}")
+
+def main():
+    """ Command line entry point for the benchmarks """
+
+    parser = argparse.ArgumentParser(description="Benchmark the blackjack engine.")
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help=f"operations to time ({', '.join(BENCHMARKS)}), all benchmarks if none are given")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="multiplies the size of every benchmark")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="slowdown allowed before a result is a regression (default 0.1)")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+
+    results = run_benchmarks(args.scale, args.names or None)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        regressions = 0
+        print(f"\nCompared with {args.compare}:")
+        for metric, old, value, change, regressed in compare(previous, results, args.threshold):
+            regressions += regressed
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{metric:<30} {old:>16,.1f} -> {value:>16,.1f} {change:+8.1%}{flag}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
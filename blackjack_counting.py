@@ -0,0 +1,129 @@
+""" Card counting
+
+A CountTracker watches the cards a Dealer deals and keeps a running count,
+true count and shoe penetration up to date, at the cost of one list index
+and two additions per card. It can also size the player's bets from the
+true count through Player.bet_hook.
+
+Tag tables map each card value from 1 (ace) to 10 to the amount it adds
+to the running count.
+
+Only cards the player has seen are counted. The dealer's hole card is held
+back until it is turned over: when the dealer draws a third card, or once
+the dealer's hand has been discarded at the end of the round.
+
+"""
+
+from blackjack import Dealer
+
+HI_LO = {1: -1, 2: 1, 3: 1, 4: 1, 5: 1, 6: 1, 7: 0, 8: 0, 9: 0, 10: -1}
+KO = {1: -1, 2: 1, 3: 1, 4: 1, 5: 1, 6: 1, 7: 1, 8: 0, 9: 0, 10: -1}
+
+
+class CountTracker():
+    """Running count, true count and penetration of the shoe being dealt.
+
+    Attach it with attach(dealer, player) or dealer.add_observer(). The
+    count starts again from initial_count whenever the dealer shuffles.
+
+    """
+
+    def __init__(self, tags=HI_LO, initial_count=0, spread=None):
+        """ INPUT: tag table, running count at the start of a shoe (unbalanced
+        counts such as KO usually start below zero), optional bet spread as a
+        list of (minimum true count, units to bet) pairs
+
+        """
+
+        self.tags = [0] * 11
+        for value, tag in tags.items():
+            self.tags[value] = tag
+        self.initial_count = initial_count
+        self.spread = sorted(spread or [], reverse=True)
+        self._running_count = initial_count
+        self._cards_seen = 0
+        self.shoe_size = 0
+        self.dealer = None # dealer whose hole card is held back
+        self.hole_card = None
+
+    def card_dealt(self, card, player_dealer):
+        """ updates the count for a card dealt, holding back the dealer's hole card """
+
+        self.reveal()
+        if isinstance(player_dealer, Dealer) and len(player_dealer.curr_hand.cards) == 2:
+            self.dealer = player_dealer
+            self.hole_card = card
+            return
+        self._running_count += self.tags[card.value]
+        self._cards_seen += 1
+
+    def reveal(self):
+        """ counts the hole card once the dealer's hand no longer hides it """
+
+        if self.hole_card is not None and len(self.dealer.curr_hand.cards) != 2:
+            self._running_count += self.tags[self.hole_card.value]
+            self._cards_seen += 1
+            self.hole_card = None
+
+    def shuffled(self, deck):
+        """ starts the count again for a freshly shuffled deck """
+        self._running_count = self.initial_count
+        self._cards_seen = 0
+        self.hole_card = None
+        self.shoe_size = len(deck.deck)
+
+    @property
+    def running_count(self):
+        """ sum of the tags of the cards seen since the shuffle """
+        self.reveal()
+        return self._running_count
+
+    @property
+    def cards_seen(self):
+        """ number of cards seen since the shuffle """
+        self.reveal()
+        return self._cards_seen
+
+    @property
+    def decks_remaining(self):
+        """ number of decks left to be dealt, never less than half a deck """
+        return max(self.shoe_size - self.cards_seen, 26) / 52
+
+    @property
+    def true_count(self):
+        """ running count per deck remaining """
+        return self.running_count / self.decks_remaining
+
+    @property
+    def penetration(self):
+        """ fraction of the shoe that has been dealt """
+        if not self.shoe_size:
+            return 0.0
+        return self.cards_seen / self.shoe_size
+
+    def bet_for(self, amount):
+        """ Scales a base bet by the spread for the current true count.
+
+        INPUT: base bet
+        OUTPUT: base bet times the units for the highest threshold reached,
+        or the base bet if no threshold is reached
+
+        """
+
+        true_count = self.true_count
+        for threshold, units in self.spread:
+            if true_count >= threshold:
+                return amount * units
+        return amount
+
+    def attach(self, dealer, player=None):
+        """ starts watching the dealer's cards, and sizes the player's bets
+        from the spread if a player is given
+
+        """
+
+        dealer.add_observer(self)
+        if dealer.deck is not None:
+            self.shoe_size = len(dealer.deck.deck)
+        if player is not None:
+            player.bet_hook = self.bet_for
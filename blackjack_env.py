@@ -0,0 +1,292 @@
+""" Vectorized environment for training decision agents
+
+Steps many independent tables at once. Each table is one player against
+the dealer with its own shoe, and everything about it lives in NumPy
+arrays indexed by table, so one call to step() takes a decision at every
+table with a handful of array operations:
+
+    env = VectorEnv(4096, seed=0)
+    observations, masks = env.reset()
+    while training:
+        actions = policy(observations, masks)
+        observations, rewards, dones, masks = env.step(actions)
+
+An observation is (hand total, soft flag, pair flag, dealer upcard) for
+the hand being played at each table. The mask says which of the ACTIONS
+are legal there, following Player.can_double_down(), Player.can_split()
+and Player.can_surrender() under the table's rules. The player's wallet
+is never short, so doubling and splitting are always affordable.
+
+A round ends when every hand of the table is finished. Its net result is
+that step's reward and the table is done. A new round is then dealt at
+once, so the observation returned is always a hand waiting for a
+decision. Rounds that settle without any decision, such as blackjacks and
+a dealer blackjack found by the peek, are settled during the same step
+and their results are added to its reward.
+
+Shoes are dealt down to the cut card of the rules' penetration and then
+reshuffled, as Dealer.end_round() does. A round that runs out of cards
+before it is over goes on with a fresh shoe, as Dealer.deal_card() does.
+
+This module needs NumPy.
+
+"""
+
+import numpy as np
+
+import blackjack_handstate as handstate
+from blackjack_rules import VEGAS_STRIP
+from blackjack_settlement import Outcome
+from blackjack_sim import STAND, HIT, DOUBLE, SPLIT, SURRENDER
+from blackjack_vector import Shoes
+
+# action indexes taken by step(), with the matching blackjack_sim action codes
+ACTIONS = (STAND, HIT, DOUBLE, SPLIT, SURRENDER)
+A_STAND, A_HIT, A_DOUBLE, A_SPLIT, A_SURRENDER = range(len(ACTIONS))
+
+_TRANSITIONS = np.array(handstate.TRANSITIONS, dtype=np.int64)
+_TOTAL = np.array(handstate.TOTAL, dtype=np.int64)
+_SOFT = np.array(handstate.SOFT, dtype=bool)
+_PAIR = np.array(handstate.PAIR, dtype=bool)
+# state of a split hand holding one card of each value
+_SPLIT_START = np.array([0] + [handstate.next_state(handstate.SPLIT_EMPTY, value)
+                               for value in range(1, 11)], dtype=np.int64)
+
+_OUTCOME = {outcome: index for index, outcome in enumerate(Outcome)}
+
+
+class VectorEnv():
+    """Batched blackjack tables with a gym style reset() and step()."""
+
+    def __init__(self, tables, seed=None, rules=None, penetration=0.75, bet=1):
+        """ INPUT: number of tables, seed, blackjack_rules.Rules (the Vegas
+        Strip rules if None), fraction of each shoe dealt before the cut
+        card, opening bet of every round
+
+        """
+
+        self.rules = rules = rules or VEGAS_STRIP
+        self.tables = tables
+        self.bet = bet
+        self.rng = np.random.default_rng(seed)
+        self.shoes = Shoes(self.rng, tables, shoe=rules.shoe)
+        self.cut_card = round(len(rules.shoe) * penetration)
+
+        self.dealer_hits = np.array(rules.dealer_hits)
+        self.can_double = np.array(rules.can_double)
+        self.can_surrender = np.array(rules.can_surrender)
+        self.can_split = np.array(rules.can_split)
+        self.net = np.array([rules.payouts[outcome] - 1 for outcome in Outcome])
+
+        hands = rules.max_hands
+        self.player = np.zeros((tables, hands), dtype=np.int64) # hand states
+        self.first = np.zeros((tables, hands), dtype=np.int64) # first card value of each hand
+        self.stakes = np.ones((tables, hands)) # 2 on doubled hands
+        self.hands = np.ones(tables, dtype=np.int64)
+        self.current = np.zeros(tables, dtype=np.int64)
+        self.surrendered = np.zeros(tables, dtype=bool)
+        self.upcard = np.zeros(tables, dtype=np.int64)
+        self.dealer = np.zeros(tables, dtype=np.int64)
+        self.lanes = np.arange(tables)
+
+        self.rounds = 0 # rounds finished since the environment was made
+        self.total_reward = 0.0
+
+    def reset(self):
+        """ Deals a new round at every table.
+
+        OUTPUT: tuple of (observations, masks)
+
+        """
+
+        rewards = np.zeros(self.tables)
+        dones = np.zeros(self.tables, dtype=bool)
+        self._deal(self.lanes, rewards, dones)
+        return self.observe(), self.masks()
+
+    def step(self, actions):
+        """ Takes one decision at every table.
+
+        INPUT: array with the index into ACTIONS of every table's action
+        OUTPUT: tuple of (observations, rewards, dones, masks) arrays, one
+        entry per table
+
+        """
+
+        actions = np.asarray(actions, dtype=np.int64)
+        lanes = self.lanes
+        if not self.masks()[lanes, actions].all():
+            raise ValueError("an action is not legal at its table, see masks()")
+
+        current = self.current
+        rewards = np.zeros(self.tables)
+        dones = np.zeros(self.tables, dtype=bool)
+        finished = (actions == A_STAND) | (actions == A_SURRENDER) | (actions == A_DOUBLE)
+        self.surrendered |= actions == A_SURRENDER
+
+        draw = lanes[(actions == A_HIT) | (actions == A_DOUBLE)]
+        self.stakes[draw, current[draw]] += actions[draw] == A_DOUBLE
+        self._draw_to_current(draw)
+
+        split = lanes[actions == A_SPLIT]
+        if len(split):
+            value = self.first[split, current[split]]
+            new = self.hands[split]
+            self.player[split, current[split]] = _SPLIT_START[value]
+            self.player[split, new] = _SPLIT_START[value]
+            self.first[split, new] = value
+            self.stakes[split, new] = 1
+            self.hands[split] += 1
+            self._draw_to_current(split)
+            finished[split] = value == 1 # split aces take one card
+
+        hand_done = _TOTAL[self.player[lanes, current]] >= 21
+        self._next_hand(lanes[finished | hand_done], rewards, dones)
+        return self.observe(), rewards, dones, self.masks()
+
+    def observe(self):
+        """ (total, soft, pair, upcard) of the hand being played at every table """
+
+        state = self.player[self.lanes, self.current]
+        return np.stack([_TOTAL[state], _SOFT[state], _PAIR[state], self.upcard], axis=1)
+
+    def masks(self):
+        """ which ACTIONS are legal for the hand being played at every table """
+
+        state = self.player[self.lanes, self.current]
+        first = self.first[self.lanes, self.current]
+        masks = np.ones((self.tables, len(ACTIONS)), dtype=bool)
+        masks[:, A_DOUBLE] = self.can_double[state]
+        masks[:, A_SPLIT] = self.can_split[self.hands, first] & _PAIR[state]
+        masks[:, A_SURRENDER] = self.can_surrender[state] & (self.hands == 1)
+        return masks
+
+    def _draw_to_current(self, lanes):
+        """ deals a card to the hand being played at each of the tables """
+        current = self.current[lanes]
+        state = self.player[lanes, current]
+        self.player[lanes, current] = _TRANSITIONS[state * 11 + self.shoes.draw(lanes)]
+
+    def _next_hand(self, lanes, rewards, dones):
+        """ moves the tables on from a finished hand to their next split hand,
+        finishing the round of tables that have played every hand
+
+        """
+
+        while len(lanes):
+            self.current[lanes] += 1
+            over = self.current[lanes] >= self.hands[lanes]
+            if over.any():
+                self._finish(lanes[over], rewards, dones)
+            lanes = lanes[~over]
+            # the next split hand gets its second card
+            self._draw_to_current(lanes)
+            state = self.player[lanes, self.current[lanes]]
+            lanes = lanes[(self.first[lanes, self.current[lanes]] == 1) | (_TOTAL[state] >= 21)]
+
+    def _finish(self, lanes, rewards, dones):
+        """ plays the dealer's hand, settles and deals the next round """
+
+        live = ((self.player[lanes] & handstate.BUST) == 0) & (
+            np.arange(self.rules.max_hands) < self.hands[lanes, None])
+        active = lanes[live.any(axis=1) & self.dealer_hits[self.dealer[lanes]]]
+        while len(active):
+            self.dealer[active] = _TRANSITIONS[self.dealer[active] * 11 + self.shoes.draw(active)]
+            active = active[self.dealer_hits[self.dealer[active]]]
+        self._settle(lanes, rewards, dones)
+        self._deal(lanes, rewards, dones)
+
+    def _settle(self, lanes, rewards, dones):
+        """ settles every hand of the tables, with the same precedence as
+        blackjack_settlement.hand_outcome()
+
+        """
+
+        dealer = self.dealer[lanes]
+        dealer_blackjack = (dealer & handstate.BLACKJACK) != 0
+        dealer_bust = (dealer & handstate.BUST) != 0
+        dealer_total = _TOTAL[dealer]
+        surrendered = self.surrendered[lanes]
+        net = np.zeros(len(lanes))
+        for hand in range(self.rules.max_hands):
+            state = self.player[lanes, hand]
+            player_blackjack = (state & handstate.BLACKJACK) != 0
+            total = _TOTAL[state]
+            outcome = np.select(
+                [dealer_blackjack & player_blackjack,
+                 dealer_blackjack,
+                 player_blackjack,
+                 surrendered,
+                 (state & handstate.BUST) != 0,
+                 dealer_bust | (total > dealer_total),
+                 total == dealer_total],
+                [_OUTCOME[Outcome.PUSH], _OUTCOME[Outcome.LOSE], _OUTCOME[Outcome.BLACKJACK],
+                 _OUTCOME[Outcome.SURRENDER], _OUTCOME[Outcome.LOSE], _OUTCOME[Outcome.WIN],
+                 _OUTCOME[Outcome.PUSH]],
+                default=_OUTCOME[Outcome.LOSE])
+            played = hand < self.hands[lanes]
+            net += np.where(played, self.stakes[lanes, hand] * self.net[outcome], 0.0)
+        net *= self.bet
+        np.add.at(rewards, lanes, net)
+        dones[lanes] = True
+        self.rounds += len(lanes)
+        self.total_reward += float(net.sum())
+
+    def _deal(self, lanes, rewards, dones):
+        """ deals new rounds, settling straight away those that need no decision """
+
+        while len(lanes):
+            shoes = self.shoes
+            shoes.position[lanes[shoes.position[lanes] >= self.cut_card]] = 0 # reshuffle
+
+            # in table order, as blackjack_table.Table.deal(): player, upcard, player, hole card
+            first = shoes.draw(lanes)
+            upcard = shoes.draw(lanes)
+            player = _TRANSITIONS[handstate.EMPTY * 11 + first]
+            player = _TRANSITIONS[player * 11 + shoes.draw(lanes)]
+            dealer = _TRANSITIONS[handstate.EMPTY * 11 + upcard]
+            self.dealer[lanes] = _TRANSITIONS[dealer * 11 + shoes.draw(lanes)]
+            self.upcard[lanes] = upcard
+            self.player[lanes] = 0
+            self.player[lanes, 0] = player
+            self.first[lanes, 0] = first
+            self.stakes[lanes] = 1
+            self.hands[lanes] = 1
+            self.current[lanes] = 0
+            self.surrendered[lanes] = False
+
+            # blackjacks, and a dealer blackjack under an ace found by the peek
+            decided = ((player & handstate.BLACKJACK) != 0) | (
+                ((self.dealer[lanes] & handstate.BLACKJACK) != 0) & (upcard == 1))
+            lanes = lanes[decided]
+            if len(lanes):
+                self._settle(lanes, rewards, dones)
+
+
+def main():
+    """ Measures the steps per second of random legal actions """
+
+    import argparse
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser(description="Step a vectorized environment with random actions.")
+    parser.add_argument('--tables', type=int, default=4096)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    env = VectorEnv(args.tables, args.seed)
+    rng = np.random.default_rng(args.seed)
+    _, masks = env.reset()
+    start = perf_counter()
+    for _ in range(args.steps):
+        # pick uniformly among the legal actions of each table
+        scores = rng.random(masks.shape) * masks
+        _, _, _, masks = env.step(scores.argmax(axis=1))
+    elapsed = perf_counter() - start
+    steps = args.steps * args.tables
+    print(f"{steps:,} steps in {elapsed:.2f}s ({steps / elapsed * 60:,.0f} steps per minute)")
+    print(f"Rounds: {env.rounds:,}, mean reward per round {env.total_reward / max(env.rounds, 1):+.4f}")
+
+if __name__ == '__main__':
+    main()
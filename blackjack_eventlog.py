@@ -0,0 +1,203 @@
+""" Binary round and event log
+
+An EventLog appends one fixed width record for everything that happens in
+a round: the seed of the shoe, shuffles, every card dealt, every action
+taken and the settlement of every hand. Records are 16 bytes:
+
+    kind    u8   one of the event kinds below
+    seat    u8   seat number, DEALER_SEAT for the dealer
+    hand    u8   hand number within the seat
+    code    u8   card code, action code or outcome index
+    round   u32  round number
+    value   i64  seed, shuffle number, bet or net result in cents
+
+Logs are read back through a memory map, a chunk of records at a time, so
+logs far larger than memory can be replayed or aggregated.
+
+"""
+
+import mmap
+import os
+import struct
+from collections import Counter, namedtuple
+
+import blackjack
+from blackjack_settlement import Outcome
+
+MAGIC = b'BJLG'
+VERSION = 1
+HEADER = struct.Struct('<4sHH') # magic, version, record size
+RECORD = struct.Struct('<BBBBIq')
+
+SEED = 0
+SHUFFLE = 1
+ROUND = 2
+DEAL = 3
+ACTION = 4
+SETTLE = 5
+
+DEALER_SEAT = 255
+OUTCOMES = list(Outcome)
+
+Event = namedtuple('Event', ['kind', 'seat', 'hand', 'code', 'round', 'value'])
+
+CHUNK_RECORDS = 65536 # records unpacked at a time when reading
+
+
+class EventLog():
+    """Writes events to an append only binary log file.
+
+    Attach it to a dealer to log every card and shuffle, then call
+    round_started(), action() and settled() as the round is played.
+    blackjack_sim.simulate() and the game loop both accept a log.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.round = 0
+        self.shuffles = 0
+        self.seats = {} # id of each seated Player -> seat number
+        self._codes = None # Card -> card code, built on the first card logged
+
+    def attach(self, dealer, players):
+        """ logs the dealer's cards and shuffles, with the players in seat order """
+
+        dealer.add_observer(self)
+        for seat, player in enumerate(players):
+            self.seats[id(player)] = seat
+
+    def detach(self, dealer):
+        """ stops logging the dealer's cards and shuffles, and forgets the seats """
+
+        dealer.remove_observer(self)
+        self.seats.clear()
+
+    def write(self, kind, seat=0, hand=0, code=0, value=0):
+        """ appends one record """
+        self.file.write(RECORD.pack(kind, seat, hand, code, self.round & 0xFFFFFFFF, value))
+
+    def seed(self, seed):
+        """ records the seed the dealer's shuffles come from """
+        self.write(SEED, value=int.from_bytes((seed & (2 ** 64 - 1)).to_bytes(8, 'little'), 'little', signed=True))
+
+    def shuffled(self, deck):
+        """ records a shuffle, as a dealer observer """
+        self.shuffles += 1
+        self.write(SHUFFLE, value=self.shuffles)
+
+    def card_dealt(self, card, player_dealer):
+        """ records a card dealt, as a dealer observer """
+
+        if self._codes is None:
+            self._codes = {card: code for code, card in enumerate(blackjack.CardDeck.cards)}
+        seat = self.seats.get(id(player_dealer), DEALER_SEAT)
+        hand = 0 if seat == DEALER_SEAT else player_dealer.index_curr_hand
+        self.write(DEAL, seat, hand, self._codes[card])
+
+    def round_started(self, players):
+        """ starts a new round, recording the opening bet of each player """
+
+        self.round += 1
+        for player in players:
+            self.write(ROUND, self.seats.get(id(player), 0), value=round(player.curr_hand.bet * 100))
+
+    def action(self, player, action):
+        """ records an action code taken on the player's current hand, one of
+        '1' to '5' (blackjack_sim.STAND to SURRENDER)
+
+        """
+
+        self.write(ACTION, self.seats.get(id(player), 0), player.index_curr_hand, ord(action))
+
+    def settled(self, player, results):
+        """ records the HandResults of one player """
+
+        seat = self.seats.get(id(player), 0)
+        for hand, result in enumerate(results):
+            self.write(SETTLE, seat, hand, OUTCOMES.index(result.outcome), round(result.net * 100))
+
+    def flush(self):
+        """ pushes buffered records to the file """
+        self.file.flush()
+
+    def close(self):
+        """ flushes and closes the file """
+        self.file.close()
+
+
+def read_events(path):
+    """ Streams the events of a log through a memory map.
+
+    OUTPUT: generator of Event
+
+    """
+
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size <= HEADER.size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, size = HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION or size != RECORD.size:
+                raise ValueError(f"{path} is not an event log")
+            view = memoryview(data)
+            end = HEADER.size + (len(data) - HEADER.size) // size * size # drop a torn last record
+            chunk = CHUNK_RECORDS * size
+            try:
+                for start in range(HEADER.size, end, chunk):
+                    for record in RECORD.iter_unpack(view[start:min(start + chunk, end)]):
+                        yield Event._make(record)
+            finally:
+                view.release()
+
+def read_rounds(path):
+    """ Groups the events of a log by round, for replaying rounds one at a
+    time. Seed and shuffle events stay with the round they were logged in,
+    events before the first round are grouped with it.
+
+    OUTPUT: generator of lists of Event
+
+    """
+
+    events = []
+    in_round = False
+    for event in read_events(path):
+        if event.kind == ROUND and event.seat == 0:
+            if in_round:
+                yield events
+                events = []
+            in_round = True
+        events.append(event)
+    if events:
+        yield events
+
+def summarize(path):
+    """ Aggregates a whole log in one pass.
+
+    OUTPUT: dict with the number of rounds, hands, cards dealt and
+    shuffles, the net result and the count of each outcome
+
+    """
+
+    counts = Counter()
+    outcomes = Counter()
+    net = 0
+    rounds = 0
+    for kind, seat, _, code, _, value in read_events(path):
+        counts[kind] += 1
+        if kind == SETTLE:
+            outcomes[OUTCOMES[code].value] += 1
+            net += value
+        elif kind == ROUND and seat == 0:
+            rounds += 1
+    return {
+        'rounds': rounds,
+        'hands': counts[SETTLE],
+        'cards': counts[DEAL],
+        'shuffles': counts[SHUFFLE],
+        'net': net / 100,
+        'outcomes': dict(outcomes),
+        }
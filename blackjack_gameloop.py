@@ -1,75 +1,183 @@
+""" Text blackjack game
+
+Plays blackjack against the dealer in the terminal:
+
+    python -m blackjack_gameloop
+
+Importing the module has no side effects. The table, dealer and player
+are only created by setup(), which run() calls, so the game functions can
+be imported and driven as a library.
+
+"""
+
 import blackjack
+import blackjack_settlement as settlement
+import blackjack_table
+from blackjack_sim import STAND, HIT, DOUBLE, SPLIT, SURRENDER, hand_decisions, next_decision
+from random import Random, SystemRandom
 from time import sleep
 
-DEALER = blackjack.Dealer()
-PLAYER = blackjack.Player()
+TABLE = None # the one seat table in play, created by setup()
+DEALER = None
+PLAYER = None
+SEED = None # seed of the dealer's shuffles, written to the log so a session can be replayed
+SHOW_HINTS = False # print the strategy table's advice before each decision
+PAUSES = True # short pauses while the dealer plays, off for scripted input
+QUIET = False # print nothing at all, for driving the game from scripted input
+read_input = input # where answers come from, see run()
+LOG = None # optional blackjack_eventlog.EventLog recording every round, see run()
+
+# states of the game loop, each handled by one function that returns the next state
+MENU = 'menu'
+BETTING = 'betting'
+QUIT = 'quit'
 
 def main_menu():
+    """ Shows the main menu and handles the choice.
 
-    prompt = "\n1. play\n2. quit game\n\nSelect an option (1-2): "
-    user_input = get_valid_input(prompt, ['1', '2'])
+    OUTPUT: next state
+
+    """
+
+    global SHOW_HINTS
+    prompt = "\n1. play\n2. quit game\n3. toggle strategy hints\n\nSelect an option (1-3): "
+    user_input = get_valid_input(prompt, ['1', '2', '3'])
 
     if user_input == '1':
-        game()
-        main_menu()
+        DEALER.new_deck()
+        show("\n-------------------------\n Dealer shuffles deck \n-------------------------\n")
+        return BETTING
     elif user_input == '2':
-        exit()
-    else:
-        print("\n\tInvalid Input!\n")
-        main_menu()
+        return QUIT
+    SHOW_HINTS = not SHOW_HINTS
+    show(f"\nStrategy hints {'on' if SHOW_HINTS else 'off'}")
+    return MENU
 
 def game():
+    """ Plays one round, from the choice to bet through to settlement.
 
-    #INITIALIZE VARIABLES
-    global DEALER
-    global PLAYER
-    DEALER.new_deck()
-    print("\n-------------------------\n Dealer shuffles deck \n-------------------------\n")
+    OUTPUT: next state
 
-    playing = True #game-loop control variable
+    """
 
-    while playing:
+    prompt = "\n1. bet\n2. stop playing\n\nSelect an option (1-2): "
+    user_input = get_valid_input(prompt, ['1', '2'])
+    if user_input == '2':
+        return MENU
+
+    bet_amount = bet() # Place a bet
+    if bet_amount == None:
+        show("Insufficient funds, GAME OVER.")
+        return MENU
+    initialize_play_phase() # Dealer deals cards to player and dealer
+    if DEALER.has_blackjack() and PLAYER.has_blackjack():
+        print_play_area()
+        show("-------- PUSH --------")
+        show("----------------------")
+        show("--- PLAYER & HOUSE ---")
+        show("--- HAVE BLACKJACK ---")
+        show("======================")
+        show(f"bet of ${bet_amount} returned")
+        settle_hands()
+    elif PLAYER.has_blackjack():
+        print_play_area()
+        show("----- PLAYER HAS BLACKJACK! -----")
+        dealer_play_hand()
+        compare_hands()
+    elif DEALER.has_blackjack():
+        print_play_area()
+        show("----- HOUSE HAS BLACKJACK! -----")
+        show("---------- HOUSE WINS ----------")
+        show("================================")
+        show(f"Bet of ${bet_amount} lost")
+        settle_hands()
+    else:
+        show("-------------------")
+        show("-- PLAYER'S TURN --")
+        show("-------------------")
+        for _ in PLAYER.hands:
+            if PLAYER.has_next_hand():
+                set_next_hand()
+            play_hand()
+        dealer_play_hand()
+        compare_hands()
+    if DEALER.end_round(): # cut card reached
+        show("\n-------------------------\n Dealer shuffles deck \n-------------------------\n")
+    return BETTING
+
+STATES = {
+    MENU: main_menu,
+    BETTING: game,
+    }
+
+def setup(rules=None, seed=None):
+    """ creates the table, dealer and player the first time it is called,
+    playing by the given blackjack_rules.Rules or the Vegas Strip rules.
+    The dealer shuffles from the given seed, or a fresh random one.
 
-        prompt = "\n1. bet\n2. stop playing\n\nSelect an option (1-2): "
-        user_input = get_valid_input(prompt, ['1', '2'])
-        
-        if user_input == '1':
-            bet_amount = bet() # Place a bet
-            if bet_amount == None:
-                print("Insufficient funds, GAME OVER.")
-                break
-            initialize_play_phase() # Dealer deals cards to player and dealer
-            if DEALER.has_blackjack() and PLAYER.has_blackjack():
-                print_play_area()
-                print("-------- PUSH --------")
-                print("----------------------")
-                print("--- PLAYER & HOUSE ---")
-                print("--- HAVE BLACKJACK ---")
-                print("======================")
-                print(f"bet of ${bet_amount} returned")
-            elif PLAYER.has_blackjack():
-                print_play_area()
-                print("----- PLAYER HAS BLACKJACK! -----")
-                dealer_play_hand()
-                compare_hands()
-            elif DEALER.has_blackjack():
-                print_play_area()
-                print("----- HOUSE HAS BLACKJACK! -----")
-                print("---------- HOUSE WINS ----------")
-                print("================================")
-                print(f"Bet of ${bet_amount} lost")
-            else:
-                print("-------------------")
-                print("-- PLAYER'S TURN --")
-                print("-------------------")
-                for _ in PLAYER.hands:
-                    if PLAYER.has_next_hand():
-                        set_next_hand()
-                    play_hand()
-                dealer_play_hand()
-                compare_hands()
-        else:
-            playing = False
+    """
+
+    global TABLE, DEALER, PLAYER, SEED
+    if TABLE is None:
+        SEED = SystemRandom().getrandbits(64) if seed is None else seed
+        TABLE = blackjack_table.Table(1, blackjack.Dealer(Random(SEED), rules=rules))
+        DEALER = TABLE.dealer
+        PLAYER = TABLE.seats[0]
+
+def run(inputs=None, log=None, quiet=False, seed=None):
+    """ Runs the game loop until the player quits. The loop never recurses,
+    so sessions of any length run in constant stack and memory.
+
+    INPUT: optional iterable of answers to use instead of the keyboard, the
+    game stops when it runs out. Pauses are skipped for scripted input.
+    Optional EventLog to record the session in, starting with the seed of
+    the shoe, flushed and detached from the dealer when the game stops.
+    In quiet mode nothing is printed or rendered. The input source, pauses,
+    log and quiet mode are put back as they were once the game stops. Optional seed
+    for the dealer's shuffles, used when the table is first set up.
+
+    """
+
+    global read_input, PAUSES, LOG, QUIET
+    setup(seed=seed)
+    saved = read_input, PAUSES, LOG, QUIET # put back when the game stops
+    QUIET = quiet
+    if inputs is not None:
+        answers = iter(inputs)
+
+        def scripted(prompt):
+            for answer in answers:
+                return answer
+            raise EOFError("out of scripted input") # as input() does at the end of a file
+
+        read_input = scripted
+        PAUSES = False
+    if log is not None:
+        LOG = log
+        log.attach(DEALER, TABLE.seats)
+        log.seed(SEED)
+
+    state = MENU
+    try:
+        while state != QUIT:
+            state = STATES[state]()
+    except EOFError:
+        pass # out of input
+    finally:
+        if log is not None:
+            log.flush()
+            log.detach(DEALER)
+        read_input, PAUSES, LOG, QUIET = saved
+
+def pause(seconds):
+    """ waits a moment so a human can follow the dealer, unless pauses are off """
+    if PAUSES and not QUIET:
+        sleep(seconds)
+
+def show(text=""):
+    """ prints a line of output, unless the game is quiet """
+    if not QUIET:
+        print(text)
 
 def bet():
     """ Discards old hands, and requests player how much they would like
@@ -81,7 +189,7 @@ def bet():
 
     PLAYER.discard_hands()
     DEALER.discard_hand()
-    print(f"\nPlayer has ${PLAYER.wallet} in their wallet!")
+    show(f"\nPlayer has ${PLAYER.wallet} in their wallet!")
     valid_bets = get_valid_bets()
     prompt = f"\nHow much would you like to bet {valid_bets}: "
     if valid_bets == None:
@@ -89,72 +197,55 @@ def bet():
     else:
         bet_amount = int(get_valid_input(prompt, valid_bets))
         PLAYER.place_bet(bet_amount)
+        if LOG is not None:
+            LOG.round_started(TABLE.seats)
         return bet_amount
 
 def get_valid_bets():
-    """ generates a list of bets the player can make based on current availble wallet """
+    """ generates a list of bets the player can make based on current availble wallet
 
-    bet_values = ['1', '5', '10', '50' ,'100']
+    OUTPUT: list of the bets the wallet can cover, or None if it can't cover any
+    """
 
-    if PLAYER.wallet <= 0:
-        return None
-    elif PLAYER.wallet >= 100:
-        return bet_values
-    elif PLAYER.wallet >= 50:
-        return bet_values[0:4]
-    elif PLAYER.wallet >= 10:
-        return bet_values[0:3]
-    elif PLAYER.wallet >= 5:
-        return bet_values[0:2]
-    else:
-        return bet_values[0]
+    bet_values = ['1', '5', '10', '50' ,'100']
+    valid_bets = [amount for amount in bet_values if int(amount) <= PLAYER.wallet]
+    return valid_bets or None
 
 def initialize_play_phase():
     """ Deals cards to each player at start of a game """
-    # bet place, dealer deals cards to player.
-    DEALER.deal_card(PLAYER)
-    DEALER.deal_card(PLAYER)
-    # dealer deals to themselves.
-    DEALER.deal_card(DEALER)
-    DEALER.deal_card(DEALER)
+    # bet placed, dealer deals to the player and themselves in table order.
+    TABLE.deal()
            
 def play_hand():
-    """ Game loop for playing out the current player's hand """
-    while True:
-        
-        print_play_area()   
-        can_split = PLAYER.can_split()
-        can_double_down = PLAYER.can_double_down()
-        num_of_curr_hand = PLAYER.index_curr_hand + 1
-        user_input = play_options(can_double_down, can_split)
-
-        if user_input == '1':
-            # Stand and move to next hand if there is one
-            print_hand_result(f"hand {num_of_curr_hand}: {PLAYER.curr_hand.value} ")
-            break
-        elif user_input == '2':
-            # Hit
-            DEALER.deal_card(PLAYER)
-        elif user_input == '3':
-            # Double down, and take one more card.
-            PLAYER.double_down()
-            DEALER.deal_card(PLAYER)
-            print_play_area()
-            if PLAYER.curr_hand.is_bust():
-                print_hand_result(f"BUST: {PLAYER.curr_hand.value} ")
-            else:    
-                print_hand_result(f"hand {num_of_curr_hand}: {PLAYER.curr_hand.value} ")
-            break
-        elif user_input == '4':
-            # Split hand
-            PLAYER.split()
-            DEALER.deal_card(PLAYER)
-        if PLAYER.curr_hand.value == 21:
-            print_hand_result(f"hand {num_of_curr_hand}: {PLAYER.curr_hand.value} ")
-            break    
-        if PLAYER.curr_hand.is_bust():
-            print_hand_result(f"BUST: {PLAYER.curr_hand.value} ")
-            break
+    """ Game loop for playing out the current player's hand, by the same
+    rules as simulated hands through blackjack_sim.hand_decisions()
+
+    """
+
+    hand = PLAYER.curr_hand
+    num_of_curr_hand = PLAYER.index_curr_hand + 1
+    user_input = None
+    decisions = hand_decisions(DEALER, PLAYER)
+    options = next_decision(decisions)
+    while options is not None:
+        can_double_down, can_split = options
+        print_play_area()
+        can_surrender = PLAYER.can_surrender()
+        if SHOW_HINTS:
+            print_hint(can_double_down, can_split)
+        user_input = play_options(can_double_down, can_split, can_surrender)
+        if LOG is not None:
+            LOG.action(PLAYER, user_input)
+        options = next_decision(decisions, user_input)
+
+    if user_input in (None, DOUBLE):
+        print_play_area() # show the card the hand was finished with
+    if hand.surrendered:
+        print_hand_result(f"SURRENDER: {hand.value} ")
+    elif hand.is_bust():
+        print_hand_result(f"BUST: {hand.value} ")
+    else:
+        print_hand_result(f"hand {num_of_curr_hand}: {hand.value} ")
 
 def dealer_play_hand():
     """ Play out the dealers hand. First checks for blackjack, or
@@ -164,114 +255,118 @@ def dealer_play_hand():
     OUTPUT: 'blackjack', 'bust', or value of the dealers hand as integer
 
     """
-    print("---------------------------------")
-    print("--------- DEALER'S TURN ---------")
-    print("---------------------------------\n")
+    show("---------------------------------")
+    show("--------- DEALER'S TURN ---------")
+    show("---------------------------------\n")
 
     while True:
         hand_value = DEALER.curr_hand.value
-        is_hand_soft = DEALER.curr_hand.is_soft
-        print("\nDealer's " + DEALER.curr_hand.__str__()[9:])
+        if not QUIET:
+            show("\nDealer's " + DEALER.curr_hand.cards_text())
         if DEALER.has_blackjack():
             return "blackjack"
-        elif hand_value < 17 or (hand_value == 17 and is_hand_soft):
+        elif DEALER.should_hit():
             DEALER.deal_card(DEALER)
         elif hand_value > 21:
             return "bust"
         else:
             return hand_value
-        sleep(0.2)
+        pause(0.2)
         
+def settle_hands():
+    """ Settles every player hand against the dealer's hand and adds the
+    winnings to the wallet.
+
+    OUTPUT: list of HandResult, one per player hand
+
+    """
+
+    results = settlement.settle(PLAYER.hands, DEALER.curr_hand, DEALER.rules.payouts)
+    for result in results:
+        PLAYER.cash_in_bet(result.bet, result.multiplier)
+    if LOG is not None:
+        LOG.settled(PLAYER, results)
+    return results
+
 def compare_hands():
-    """Compares player's hands with the dealers hand, prints results and winnings
-    and adds winning to wallet.
+    """Compares player's hands with the dealers hand, adds winnings to
+    wallet and prints results and winnings.
 
     """
-    num = 1 # Number of current hand
+
+    print_results(settle_hands())
+
+def print_results(results):
+    """ Prints the result and winnings of each of the player's hands """
+
+    if QUIET:
+        return
+
     dealers_hand = DEALER.curr_hand
-    
-    for players_hand in PLAYER.hands:
-        
-        bet_amount = players_hand.bet
+    dealer_blackjack = dealers_hand.is_blackjack()
+
+    for num, (players_hand, result) in enumerate(zip(PLAYER.hands, results), 1):
+
+        bet_amount = result.bet
         if num > 1:
-            print("\n\n=================================")
-            print(f"----------- Hand {num} -------------")
-        print("=================================")
-        print(f"-- Dealer: {dealers_hand.value}  vs  Player: {players_hand.value} --")
-        print("=================================")
-        if dealers_hand.is_blackjack() and players_hand.is_blackjack() :
-            print("------------- PUSH --------------")
-            print("---------------------------------")
-            print("-------- PLAYER & HOUSE ---------")
-            print("-------- HAVE BLACKJACK ---------")
-            print("=================================")
-            print(f"Hand {num}'s bet of ${bet_amount} returned")
-            print("=================================")
-            PLAYER.cash_in_bet(bet_amount, 1)
-        elif dealers_hand.is_blackjack():
-            print("----- DEALER HAS BLACKJACK! -----")
-            print("---------- DEALER WINS ----------")
-            print("=================================")
-            print(f"Hand {num}'s bet of ${bet_amount} lost")
-            print("=================================")
-        elif players_hand.is_blackjack():
-            print("----- PLAYER HAS BLACKJACK! -----")
-            print("---------- PLAYER WINS ----------")
-            print("=================================")
-            print(f"Hand {num} wins you ${2.5*bet_amount}")
-            print("=================================")
-            PLAYER.cash_in_bet(bet_amount, 2.5)
-        elif dealers_hand.is_bust() and players_hand.is_bust():
-            print("------------- PUSH --------------")
-            print("=================================")
-            print(f"Hand {num}'s bet of ${bet_amount} returned")
-            print("=================================")
-            PLAYER.cash_in_bet(bet_amount, 1)
-        elif dealers_hand.is_bust():
-            print("--------- PLAYER WINS! ----------")
-            print("=================================")
-            print(f"Hand {num} wins you ${2*bet_amount}")
-            print("=================================")
-            PLAYER.cash_in_bet(bet_amount, 2)
-        elif players_hand.is_bust():
-            print("--------- DEALER WINS! ----------")
-            print("=================================")
-            print(f"Hand {num}'s bet of ${bet_amount} is lost")
-        elif dealers_hand.value == players_hand.value:
-            print("------------- PUSH --------------")
-            print("=================================")
-            print(f"Hand {num} bet of ${bet_amount} returned")
-            print("=================================")
-            PLAYER.cash_in_bet(bet_amount, 1)
-        elif dealers_hand.value > players_hand.value:
-            print("--------- DEALER WINS! ----------")
-            print("=================================")
-            print(f"Hand {num}'s bet of ${bet_amount} is lost")
-            print("=================================")
-        elif players_hand.value > dealers_hand.value:
-            print("--------- PLAYER WINS! ----------")
-            print("=================================")
-            print(f"Hand {num} wins you ${2*bet_amount}")
-            print("=================================")
-            PLAYER.cash_in_bet(bet_amount, 2)
-        num += 1 # increment hand number
-        sleep(0.3)
+            show("\n\n=================================")
+            show(f"----------- Hand {num} -------------")
+        show("=================================")
+        show(f"-- Dealer: {dealers_hand.value}  vs  Player: {players_hand.value} --")
+        show("=================================")
+        if result.outcome == settlement.Outcome.PUSH and dealer_blackjack:
+            show("------------- PUSH --------------")
+            show("---------------------------------")
+            show("-------- PLAYER & HOUSE ---------")
+            show("-------- HAVE BLACKJACK ---------")
+            show("=================================")
+            show(f"Hand {num}'s bet of ${bet_amount} returned")
+        elif result.outcome == settlement.Outcome.LOSE and dealer_blackjack:
+            show("----- DEALER HAS BLACKJACK! -----")
+            show("---------- DEALER WINS ----------")
+            show("=================================")
+            show(f"Hand {num}'s bet of ${bet_amount} lost")
+        elif result.outcome == settlement.Outcome.BLACKJACK:
+            show("----- PLAYER HAS BLACKJACK! -----")
+            show("---------- PLAYER WINS ----------")
+            show("=================================")
+            show(f"Hand {num} wins you ${result.multiplier * bet_amount}")
+        elif result.outcome == settlement.Outcome.WIN:
+            show("--------- PLAYER WINS! ----------")
+            show("=================================")
+            show(f"Hand {num} wins you ${result.multiplier * bet_amount}")
+        elif result.outcome == settlement.Outcome.SURRENDER:
+            show("------- PLAYER SURRENDERS -------")
+            show("=================================")
+            show(f"Half of hand {num}'s bet of ${bet_amount} returned")
+        elif result.outcome == settlement.Outcome.PUSH:
+            show("------------- PUSH --------------")
+            show("=================================")
+            show(f"Hand {num}'s bet of ${bet_amount} returned")
+        else:
+            show("--------- DEALER WINS! ----------")
+            show("=================================")
+            show(f"Hand {num}'s bet of ${bet_amount} is lost")
+        show("=================================")
+        pause(0.3)
 
 def print_play_area():
     """ Prints details for a hand in play """
 
+    if QUIET:
+        return
 
     total_hands = len(PLAYER.hands)
     num_of_curr_hand = PLAYER.index_curr_hand + 1
 
-    print("\n===================================================")
-    print("Wallet: ${}  ".format(PLAYER.wallet))
-    print("===================================================")
-    print(f"Dealer showing -> {DEALER.curr_hand.cards[0].name}")
-    print("---------------------------------------------------")
-    print(f"hand {num_of_curr_hand} of {total_hands}")
-    print(PLAYER.curr_hand.__str__())
-    print("---------------------------------------------------\n")
+    show("\n===================================================")
+    show("Wallet: ${}  ".format(PLAYER.wallet))
+    show("===================================================")
+    show(f"Dealer showing -> {DEALER.curr_hand.cards[0].name}")
+    show("---------------------------------------------------")
+    show(f"hand {num_of_curr_hand} of {total_hands}")
+    show(str(PLAYER.curr_hand))
+    show("---------------------------------------------------\n")
     
 def set_next_hand():
     """ prints that next hand is being played and updates players current hand
@@ -279,53 +374,64 @@ def set_next_hand():
     
     """
 
-    print("|     Next hand     |")
-    print("=" * 21)
+    show("|     Next hand     |")
+    show("=" * 21)
     PLAYER.set_next_hand()
     DEALER.deal_card(PLAYER)
 
+def print_hint(can_double_down, can_split):
+    """ prints the action the strategy table for the table's rules recommends
+    for the current hand
+
+    """
+
+    import blackjack_strategy # the table is only loaded once hints are used
+
+    table = blackjack_strategy.rules_table(DEALER.rules)
+    action = table.action(PLAYER.curr_hand, DEALER.curr_hand.cards[0], can_double_down, can_split)
+    show(f"Hint: {action}) {blackjack_strategy.ACTION_NAMES[action]}\n")
+
 def print_hand_result(result):
     """ prints out result window of played hand
     
     INPUT: expects string of even length
 
     """
-    
+
+    if QUIET:
+        return
     if len(result) % 2:
         empty_space = " " * int((19 - len(result)) / 2)
     else:
         empty_space = " " * int((18 - len(result)) / 2)
-    print("\n" + "=" * 21)
-    print("|" + empty_space + f"{result}" + empty_space + "|")
-    print("=" * 21)
+    show("\n" + "=" * 21)
+    show("|" + empty_space + f"{result}" + empty_space + "|")
+    show("=" * 21)
 
-def play_options(can_double_down, can_split):
+def play_options(can_double_down, can_split, can_surrender=False):
     """ List all options a player has available to them when playing a given hand.
     Validates input for each set of options, if valid returns the input.
 
-    OUTPUT: single character '1', '2', '3', or '4'
+    OUTPUT: single character '1', '2', '3', '4' or '5'
     """
 
-    options = ("1) Stand.", "2) Take hit", "3) Double down", "4) Split hand")
-    prompt = ""
-    if can_double_down and can_split:
-        # Request user choice between first 4 options
-        for option in options:
-            prompt += option + "\n"
-        prompt += "Select an option (1-4): "
-        return get_valid_input(prompt, ['1', '2', '3', '4'])
-    elif can_double_down:
-        # Request user choice between first 3 options
-        for option in options[0:3]:
-            prompt += option + "\n"
-        prompt += "Select an option (1-3): "
-        return get_valid_input(prompt, ['1', '2', '3'])
-    else:
-        # Request user choice between first 2 options
-        for option in options[0:2]:
-            prompt += option + "\n"
-        prompt += "Select an option (1-2): "
-        return get_valid_input(prompt, ['1', '2'])
+    options = {
+        STAND: "1) Stand.",
+        HIT: "2) Take hit",
+        DOUBLE: "3) Double down",
+        SPLIT: "4) Split hand",
+        SURRENDER: "5) Surrender",
+        }
+    valid = [STAND, HIT]
+    if can_double_down:
+        valid.append(DOUBLE)
+    if can_split:
+        valid.append(SPLIT)
+    if can_surrender:
+        valid.append(SURRENDER)
+    prompt = "".join(options[option] + "\n" for option in valid)
+    prompt += f"Select an option ({', '.join(valid)}): "
+    return get_valid_input(prompt, valid)
 
 def get_valid_input(prompt, valid_input):
     """ prompts user for input and using the provided list
@@ -336,9 +442,10 @@ def get_valid_input(prompt, valid_input):
     """
     is_valid = False
     while not is_valid:
-        user_input = input(prompt)
+        user_input = read_input(prompt)
         is_valid = user_input in valid_input # validates input
 
     return user_input
 
-main_menu()
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,135 @@
+""" Hand state transition table
+
+Every hand is reduced to a small integer state that records only what the
+rules care about: the total, whether an ace is counted as 11, how many cards
+it holds (0, 1, 2 or 3+), whether its first two cards are a pair and
+whether it was made by a split. All states and their transitions are
+worked out once when the module is imported, so adding a card to a hand is
+a single list index:
+
+    state = TRANSITIONS[state * 11 + card_value]
+
+The two lowest bits of a state are its BUST and BLACKJACK flags, so they
+can be tested on the new state without a second lookup.
+
+"""
+
+BUST = 1
+BLACKJACK = 2
+FLAG_BITS = 2
+MAX_TOTAL = 31 # a hard 21 plus a ten, the highest total a hand can reach
+
+
+def _next_key(key, value):
+    """ works out the key of the state reached by adding a card of the given value """
+
+    total, soft, count, pair, split = key
+    if total > 21:
+        return key # a bust hand stays bust
+
+    first_value = (1 if soft else total) if count == 1 else 0
+    if value == 1 and total + 11 <= 21:
+        total += 11
+        soft = True
+    else:
+        total += value
+    if total > 21 and soft:
+        total -= 10
+        soft = False
+
+    pair = count == 1 and value == first_value
+    return (min(total, MAX_TOTAL), soft, min(count + 1, 3), pair, split)
+
+def _flags(key):
+    """ BUST and BLACKJACK bits of a state key """
+
+    total, _, count, _, split = key
+    if total > 21:
+        return BUST
+    if total == 21 and count == 2 and not split:
+        return BLACKJACK
+    return 0
+
+def _build():
+    """ numbers every reachable state and fills in the lookup tables """
+
+    start_keys = [(0, False, 0, False, False), (0, False, 0, False, True)]
+    ids = {}
+    queue = list(start_keys)
+    while queue:
+        key = queue.pop()
+        if key in ids:
+            continue
+        ids[key] = (len(ids) << FLAG_BITS) | _flags(key)
+        for value in range(1, 11):
+            queue.append(_next_key(key, value))
+
+    size = (len(ids) << FLAG_BITS)
+    transitions = [0] * (size * 11)
+    total = [0] * size
+    soft = [False] * size
+    count = [0] * size
+    pair = [False] * size
+    split = [False] * size
+    for key, state in ids.items():
+        for value in range(1, 11):
+            transitions[state * 11 + value] = ids[_next_key(key, value)]
+        total[state], soft[state], count[state], pair[state], split[state] = key
+    return ids[start_keys[0]], ids[start_keys[1]], transitions, total, soft, count, pair, split
+
+EMPTY, SPLIT_EMPTY, TRANSITIONS, TOTAL, SOFT, COUNT, PAIR, SPLIT = _build()
+
+
+def next_state(state, value):
+    """ returns the state reached by adding a card of the given value (1-10) """
+    return TRANSITIONS[state * 11 + value]
+
+def hand_state(values, split=False):
+    """ returns the state of a hand holding cards of the given values """
+
+    state = SPLIT_EMPTY if split else EMPTY
+    for value in values:
+        state = TRANSITIONS[state * 11 + value]
+    return state
+
+
+class FastHand():
+    """A hand reduced to its state, for simulations that never show the cards.
+
+    Holds only the state and the bet, everything else is read from the
+    tables above.
+
+    """
+
+    __slots__ = ('state', 'bet')
+
+    def __init__(self, bet=0, split=False):
+        self.state = SPLIT_EMPTY if split else EMPTY
+        self.bet = bet
+
+    def add_value(self, value):
+        """ adds a card of the given value and returns the new state """
+        self.state = TRANSITIONS[self.state * 11 + value]
+        return self.state
+
+    @property
+    def value(self):
+        """ total of the hand """
+        return TOTAL[self.state]
+
+    @property
+    def is_soft(self):
+        """ whether an ace is counted as 11 """
+        return SOFT[self.state]
+
+    def is_bust(self):
+        """ checks if value is more than 21 """
+        return self.state & BUST == BUST
+
+    def is_blackjack(self):
+        """ checks if the hand is a two card 21 that didn't come from a split """
+        return self.state & BLACKJACK == BLACKJACK
+
+    def is_pair(self):
+        """ checks if the hand is two cards of the same value """
+        return PAIR[self.state]
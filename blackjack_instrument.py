@@ -0,0 +1,153 @@
+""" Opt-in counters and timers for the engine's hot paths
+
+Nothing is measured until enable() is called. It swaps the hot path
+functions for wrappers that count every call and add its duration to a
+histogram, and disable() puts the originals back, so a run that never
+enables instrumentation pays nothing for it.
+
+Timings are inclusive: the time of Dealer.deal_card includes the
+Hand.add_to_value it triggers. Any other callable, such as a strategy,
+can be measured with timed().
+
+    blackjack_instrument.enable()
+    blackjack_sim.simulate(blackjack_instrument.timed('strategy', strategy), 10000)
+    print(blackjack_instrument.snapshot())
+
+"""
+
+import sys
+from functools import wraps
+from time import perf_counter_ns
+
+# probe name -> (module, attribute path) of the function it measures. Probes
+# in modules that have not been imported yet are skipped, the game loop is
+# never imported just to instrument it.
+TARGETS = {
+    'deal_card': ('blackjack', 'Dealer.deal_card'),
+    'add_to_value': ('blackjack', 'Hand.add_to_value'),
+    'settle': ('blackjack_settlement', 'settle'),
+    'compare_hands': ('blackjack_gameloop', 'compare_hands'),
+    }
+
+BUCKETS = 40 # histogram buckets, bucket n counts calls shorter than 2**n ns
+
+
+class Probe():
+    """Call count, total time and a power of two histogram of call times."""
+
+    __slots__ = ('count', 'total_ns', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.histogram = [0] * BUCKETS
+
+    def add(self, ns):
+        """ records one call that took ns nanoseconds """
+        self.count += 1
+        self.total_ns += ns
+        self.histogram[min(ns.bit_length(), BUCKETS - 1)] += 1
+
+    def as_dict(self):
+        """ the probe's numbers, with the histogram keyed by upper bound in ns """
+        return {
+            'count': self.count,
+            'total_ns': self.total_ns,
+            'mean_ns': self.total_ns / self.count if self.count else 0.0,
+            'histogram': {2 ** bucket: calls for bucket, calls in enumerate(self.histogram) if calls},
+            }
+
+
+probes = {} # probe name -> Probe
+_patched = [] # (owner, attribute, original) of every function swapped by enable()
+
+
+def probe(name):
+    """ gets the probe with the given name, creating it on first use """
+    if name not in probes:
+        probes[name] = Probe()
+    return probes[name]
+
+def timed(name, function):
+    """ Wraps a callable so that every call is counted and timed under the
+    given probe name.
+
+    OUTPUT: wrapped callable
+
+    """
+
+    record = probe(name).add
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        start = perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(perf_counter_ns() - start)
+    wrapper.__wrapped_probe__ = name
+    return wrapper
+
+def _rebind(original, replacement):
+    """ replaces every module level reference to a function, including
+    ones made with from ... import
+
+    """
+
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, '__dict__', None)
+        if not namespace:
+            continue
+        for attribute, value in list(namespace.items()):
+            if value is original:
+                setattr(module, attribute, replacement)
+                _patched.append((module, attribute, original))
+
+def enable(names=None):
+    """ Starts measuring the hot paths.
+
+    INPUT: optional list of probe names from TARGETS, all of them if None
+
+    """
+
+    if _patched:
+        disable()
+    for name in names or TARGETS:
+        module_name, path = TARGETS[name]
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        owner_path, _, attribute = path.rpartition('.')
+        if owner_path:
+            owner = getattr(module, owner_path)
+            original = owner.__dict__[attribute]
+            setattr(owner, attribute, timed(name, original))
+            _patched.append((owner, attribute, original))
+        else:
+            original = getattr(module, attribute)
+            _rebind(original, timed(name, original))
+
+def disable():
+    """ puts back every function swapped by enable() """
+
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+
+def enabled():
+    """ checks if the hot paths are being measured """
+    return bool(_patched)
+
+def reset():
+    """ forgets everything measured so far """
+    probes.clear()
+
+def snapshot():
+    """ Exports the current numbers of every probe.
+
+    OUTPUT: dict of probe name -> dict of count, total_ns, mean_ns and
+    histogram, ready for json.dump()
+
+    """
+
+    return {name: probe.as_dict() for name, probe in probes.items()}
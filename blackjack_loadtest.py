@@ -0,0 +1,90 @@
+""" Load test client for blackjack_server
+
+Opens many concurrent connections to a running server from one event loop.
+Every client bets the minimum and picks a random valid action at every
+prompt, for a fixed number of rounds, then quits. Reports the sessions
+completed, rounds per second and the latency of the prompts.
+
+    python blackjack_server.py &
+    python blackjack_loadtest.py --clients 2000 --rounds 20
+
+"""
+
+import argparse
+import asyncio
+from random import Random
+from time import perf_counter
+
+
+async def run_client(host, port, rounds, rng, latencies):
+    """ Plays one session against the server.
+
+    OUTPUT: number of rounds played
+
+    """
+
+    reader, writer = await asyncio.open_connection(host, port)
+    played = 0
+    sent = perf_counter()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line or line == b"bye\n":
+                return played
+            if not line.startswith(b"?"):
+                continue
+            latencies.append(perf_counter() - sent)
+
+            _, name, *valid = line.decode().split()
+            if name == 'bet':
+                answer = 'q' if played == rounds else valid[0]
+                played += answer != 'q'
+            else:
+                answer = rng.choice(valid)
+            sent = perf_counter()
+            writer.write(answer.encode() + b"\n")
+            await writer.drain()
+    finally:
+        writer.close()
+
+async def load_test(host, port, clients, rounds, seed=None):
+    """ Runs all the clients at once.
+
+    OUTPUT: tuple of (sessions completed, rounds played, seconds taken,
+    sorted prompt latencies in seconds)
+
+    """
+
+    rng = Random(seed)
+    latencies = []
+    start = perf_counter()
+    results = await asyncio.gather(
+        *(run_client(host, port, rounds, Random(rng.getrandbits(64)), latencies)
+          for _ in range(clients)),
+        return_exceptions=True)
+    elapsed = perf_counter() - start
+    played = [result for result in results if isinstance(result, int)]
+    return len(played), sum(played), elapsed, sorted(latencies)
+
+def main():
+    """ Command line entry point for the load test """
+
+    parser = argparse.ArgumentParser(description="Load test a blackjack server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8021)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=10, help="rounds per client")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    sessions, rounds, elapsed, latencies = asyncio.run(
+        load_test(args.host, args.port, args.clients, args.rounds, args.seed))
+    print(f"Sessions completed: {sessions} of {args.clients}")
+    print(f"Rounds played: {rounds} in {elapsed:.2f}s ({rounds / elapsed:,.0f} rounds per second)")
+    if latencies:
+        median = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"Prompt latency: median {median:.2f}ms, 99th percentile {p99:.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+""" Exact dealer outcome probabilities
+
+Works out the probability of every final dealer result for a given upcard
+and the cards left in the shoe, by walking every sequence of cards the
+dealer can draw under the module rules: the dealer draws to 17, stands on
+soft 17 (or hits it, for rules where the dealer hits soft 17) and peeks
+for blackjack under a face up ace.
+
+A shoe composition is a tuple of 10 counts, the number of cards of each
+value from 1 (ace) to 10 left in the shoe.
+
+"""
+
+from functools import lru_cache
+
+import blackjack
+import blackjack_handstate as handstate
+
+OUTCOMES = (17, 18, 19, 20, 21, 'bust', 'blackjack')
+BUST = 5
+BLACKJACK = 6
+
+# a dealer hand stands on every total of 17 or more, soft 17 included
+_STANDS = [total >= 17 for total in handstate.TOTAL]
+# unless the dealer hits soft 17
+_STANDS_H17 = [total >= 18 or (total == 17 and not soft)
+               for total, soft in zip(handstate.TOTAL, handstate.SOFT)]
+
+
+def composition(deck):
+    """ counts the cards of each value left in a CardDeck
+
+    OUTPUT: tuple of 10 counts for the values 1 to 10
+
+    """
+
+    counts = [0] * 10
+    cards = blackjack.CardDeck.cards
+    for code in deck.deck:
+        counts[cards[code].value - 1] += 1
+    return tuple(counts)
+
+def remove_cards(shoe, values):
+    """ returns the composition left after the cards with the given values are dealt """
+
+    counts = list(shoe)
+    for value in values:
+        counts[value - 1] -= 1
+    return tuple(counts)
+
+@lru_cache(maxsize=65536)
+def dealer_probabilities(upcard, shoe, peeked=None, hit_soft_17=False):
+    """ Probability of each dealer outcome, in the order of OUTCOMES.
+
+    INPUT: value of the dealer's upcard (1-10), composition of the shoe
+    without the upcard, whether the dealer has already peeked and found no
+    blackjack (defaults to True under an ace, as in Dealer.has_blackjack),
+    whether the dealer hits soft 17
+    OUTPUT: tuple of 7 probabilities
+
+    """
+
+    if peeked is None:
+        peeked = upcard == 1
+    state = handstate.next_state(handstate.EMPTY, upcard)
+    if not peeked:
+        return _draw(state, shoe, hit_soft_17)
+
+    # the hole card can't be one that makes blackjack
+    remaining = sum(shoe)
+    probabilities = [0.0] * 7
+    for value in range(1, 11):
+        count = shoe[value - 1]
+        next_state = handstate.next_state(state, value)
+        if count and not next_state & handstate.BLACKJACK:
+            remaining_shoe = shoe[:value - 1] + (count - 1,) + shoe[value:]
+            outcome = _draw(next_state, remaining_shoe, hit_soft_17)
+            for index in range(7):
+                probabilities[index] += count * outcome[index]
+        elif count:
+            remaining -= count
+    return tuple(probability / remaining for probability in probabilities)
+
+@lru_cache(maxsize=262144)
+def _draw(state, shoe, hit_soft_17=False):
+    """ outcome probabilities for a dealer hand in the given state """
+
+    if state & handstate.BUST:
+        return (0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+    if (_STANDS_H17 if hit_soft_17 else _STANDS)[state]:
+        probabilities = [0.0] * 7
+        if state & handstate.BLACKJACK:
+            probabilities[BLACKJACK] = 1.0
+        else:
+            probabilities[handstate.TOTAL[state] - 17] = 1.0
+        return tuple(probabilities)
+
+    remaining = sum(shoe)
+    probabilities = [0.0] * 7
+    for value in range(1, 11):
+        count = shoe[value - 1]
+        if count:
+            remaining_shoe = shoe[:value - 1] + (count - 1,) + shoe[value:]
+            outcome = _draw(handstate.TRANSITIONS[state * 11 + value], remaining_shoe, hit_soft_17)
+            for index in range(7):
+                probabilities[index] += count * outcome[index]
+    return tuple(probability / remaining for probability in probabilities)
+
+def cache_clear():
+    """ empties the memoized results """
+    dealer_probabilities.cache_clear()
+    _draw.cache_clear()
@@ -0,0 +1,191 @@
+""" Table rule variations
+
+A Rules object describes the rules a table is played under and compiles
+them once into lookup tables, so the engine applies any variation with
+the same single index it uses for the default rules:
+
+    dealer.rules.dealer_hits[hand.state]     should the dealer draw
+    player.rules.can_double[hand.state]      may this hand double down
+    player.rules.can_split[hands][value]     may a pair of this value split
+    dealer.rules.payouts[outcome]            amount returned per unit bet
+
+The defaults are the Vegas Strip rules of the blackjack module. variants()
+builds every combination of a set of options, for sweeping rule variants
+in one run:
+
+    python blackjack_rules.py 100000 --decks 1 2 6 8 --hit-soft-17 both --surrender both
+
+"""
+
+from itertools import product
+
+import blackjack_handstate as handstate
+from blackjack_settlement import Outcome, PAYOUTS
+
+
+class Rules():
+    """The rules of one table, compiled into lookup tables.
+
+    Rules are treated as immutable once made, make a new object for every
+    variation.
+
+    """
+
+    def __init__(self, decks=6, hit_soft_17=False, blackjack_pays=1.5, surrender=False,
+                 max_hands=4, double_after_split=True):
+        """ INPUT: decks in the shoe, whether the dealer hits soft 17,
+        amount won per unit bet on a blackjack (1.5 for 3:2, 1.2 for 6:5),
+        whether late surrender is offered, most hands a player can split
+        to, whether split hands may double down
+
+        """
+
+        if not 1 <= decks <= 8:
+            raise ValueError(f"a shoe holds 1 to 8 decks, not {decks}")
+        if not 1 <= max_hands <= 8:
+            raise ValueError(f"max_hands must be 1 to 8, not {max_hands}")
+        self.decks = decks
+        self.hit_soft_17 = hit_soft_17
+        self.blackjack_pays = blackjack_pays
+        self.surrender = surrender
+        self.max_hands = max_hands
+        self.double_after_split = double_after_split
+        self.compile()
+
+    def compile(self):
+        """ works out the lookup tables from the options """
+
+        total, soft, count, split = handstate.TOTAL, handstate.SOFT, handstate.COUNT, handstate.SPLIT
+        states = range(len(total))
+
+        # card codes of a full shoe in unshuffled order, and its composition by value
+        self.shoe = bytes(range(52)) * self.decks
+        self.composition = (4 * self.decks,) * 9 + (16 * self.decks,)
+
+        self.dealer_hits = [total[state] < 17 or (self.hit_soft_17 and total[state] == 17 and soft[state])
+                            for state in states]
+        self.can_double = [count[state] == 2 and total[state] <= 21
+                           and (self.double_after_split or not split[state])
+                           for state in states]
+        self.can_surrender = [self.surrender and count[state] == 2 and not split[state]
+                              for state in states]
+        # [hands held][first card value], aces may only be split once
+        self.can_split = [[hands < self.max_hands and (value != 1 or hands == 1) for value in range(11)]
+                          for hands in range(self.max_hands + 1)]
+
+        self.payouts = dict(PAYOUTS)
+        self.payouts[Outcome.BLACKJACK] = 1 + self.blackjack_pays
+
+    def wallet_needed(self, bet):
+        """ money needed on top of an opening bet to split to the most hands
+        the rules allow and double down on each of them
+
+        """
+
+        return (2 * self.max_hands - 1) * bet
+
+    def options(self):
+        """ the options the rules were made with, as a dict """
+        return {
+            'decks': self.decks,
+            'hit_soft_17': self.hit_soft_17,
+            'blackjack_pays': self.blackjack_pays,
+            'surrender': self.surrender,
+            'max_hands': self.max_hands,
+            'double_after_split': self.double_after_split,
+            }
+
+    def __str__(self):
+        string = f"{self.decks} deck{'s' if self.decks > 1 else ''}, "
+        string += "H17" if self.hit_soft_17 else "S17"
+        string += f", blackjack pays {self.blackjack_pays:g}"
+        string += ", surrender" if self.surrender else ""
+        string += f", split to {self.max_hands}"
+        string += ", DAS" if self.double_after_split else ", no DAS"
+        return string
+
+    def __repr__(self):
+        options = ', '.join(f"{name}={value!r}" for name, value in self.options().items())
+        return f"Rules({options})"
+
+    def __getstate__(self):
+        return self.options() # the tables are rebuilt rather than pickled
+
+    def __setstate__(self, options):
+        self.__init__(**options)
+
+VEGAS_STRIP = Rules()
+
+
+def variants(**choices):
+    """ Builds the Rules for every combination of the given choices.
+
+    INPUT: keyword arguments of Rules, each a list of the values to try
+    OUTPUT: list of Rules
+
+    """
+
+    names = list(choices)
+    return [Rules(**dict(zip(names, values))) for values in product(*choices.values())]
+
+def sweep(strategy, rounds, rules_list, bet=1, seed=0):
+    """ Simulates the same number of rounds under every set of rules, each
+    from the same seed.
+
+    With no strategy every set of rules is played with the strategy table
+    built for it, so options such as surrender are played as well as
+    possible rather than never taken.
+
+    INPUT: strategy callable or None, rounds under each set of rules, list
+    of Rules, opening bet, seed
+    OUTPUT: list of (Rules, blackjack_sim.SimulationResult)
+
+    """
+
+    from random import Random
+
+    import blackjack
+    import blackjack_sim
+    import blackjack_strategy
+
+    results = []
+    for rules in rules_list:
+        dealer = blackjack.Dealer(Random(seed), rules=rules)
+        play = strategy or blackjack_strategy.rules_table(rules)
+        result = blackjack_sim.simulate(play, rounds, bet, dealer, blackjack.Player(rules))
+        results.append((rules, result))
+    return results
+
+def main():
+    """ Command line entry point for sweeping rule variants """
+
+    import argparse
+
+    import blackjack_sim
+
+    flags = {'yes': [True], 'no': [False], 'both': [False, True]}
+    parser = argparse.ArgumentParser(description="Compare the house edge under rule variants.")
+    parser.add_argument('rounds', type=int, help="rounds to play under each set of rules")
+    parser.add_argument('--strategy', choices=list(blackjack_sim.STRATEGIES) + ['table'], default='table',
+                        help="'table' plays the strategy table built for each set of rules")
+    parser.add_argument('--decks', type=int, nargs='+', default=[6])
+    parser.add_argument('--hit-soft-17', choices=flags, default='no')
+    parser.add_argument('--surrender', choices=flags, default='no')
+    parser.add_argument('--blackjack-pays', type=float, nargs='+', default=[1.5])
+    parser.add_argument('--max-hands', type=int, nargs='+', default=[4])
+    parser.add_argument('--double-after-split', choices=flags, default='yes')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rules_list = variants(decks=args.decks,
+                          hit_soft_17=flags[args.hit_soft_17],
+                          blackjack_pays=args.blackjack_pays,
+                          surrender=flags[args.surrender],
+                          max_hands=args.max_hands,
+                          double_after_split=flags[args.double_after_split])
+    strategy = blackjack_sim.STRATEGIES.get(args.strategy) # None plays each variant's table
+    for rules, result in sweep(strategy, args.rounds, rules_list, seed=args.seed):
+        print(f"{result.house_edge:+8.3%}  {rules}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+""" Asyncio blackjack server
+
+Hosts any number of concurrent tables in one process, with no thread per
+connection. Every connection gets its own one seat Table, and the game is
+played as a coroutine that awaits the player's choices from a front end.
+
+The line protocol is plain text so it can be played with netcat. Every
+line the server sends is information, except prompts, which start with
+'?' followed by the prompt name and the valid answers:
+
+    ? bet 1 5 10 q
+    ? action 1 2 3
+
+and are answered with a single line holding one of the valid answers.
+
+    python blackjack_server.py --port 8021
+
+"""
+
+import argparse
+import asyncio
+from random import Random
+
+import blackjack
+import blackjack_table
+from blackjack_sim import STAND, HIT, DOUBLE, SPLIT, SURRENDER, hand_decisions, next_decision
+
+BET_VALUES = [1, 5, 10, 50, 100]
+QUIT = 'q'
+
+
+class LineFrontEnd():
+    """Front end that talks the line protocol over an asyncio stream.
+
+    Any front end with the same ask() and show() methods can drive a
+    session, e.g. for tests or a different wire format.
+
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def show(self, text):
+        """ sends lines of information """
+        self.writer.write(text.encode() + b'\n')
+
+    async def ask(self, name, valid):
+        """ Sends a prompt and waits until one of the valid answers comes back.
+
+        OUTPUT: the answer, or None if the connection was closed
+
+        """
+
+        prompt = f"? {name} {' '.join(valid)}\n".encode()
+        while True:
+            self.writer.write(prompt)
+            await self.writer.drain()
+            try:
+                line = await self.reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                continue # a line over the stream limit is dropped and asked again
+            if not line:
+                return None
+            answer = line.decode(errors='replace').strip()
+            if answer in valid:
+                return answer
+
+
+def valid_bets(wallet):
+    """ bets the wallet can cover, as strings """
+    return [str(amount) for amount in BET_VALUES if amount <= wallet]
+
+async def play_hand(front_end, dealer, player):
+    """ Plays out the player's current hand with choices from the front end,
+    through the same blackjack_sim.hand_decisions() as simulated hands.
+
+    OUTPUT: False if the player disconnected
+
+    """
+
+    hand = player.curr_hand
+    decisions = hand_decisions(dealer, player)
+    options = next_decision(decisions)
+    while options is not None:
+        can_double_down, can_split = options
+        front_end.show(f"hand {player.index_curr_hand + 1} of {len(player.hands)}\n{hand}")
+        valid = [STAND, HIT]
+        if can_double_down:
+            valid.append(DOUBLE)
+        if can_split:
+            valid.append(SPLIT)
+        if player.can_surrender():
+            valid.append(SURRENDER)
+        action = await front_end.ask('action', valid)
+        if action is None:
+            return False
+        options = next_decision(decisions, action)
+    front_end.show(f"hand {player.index_curr_hand + 1}: {hand.value}")
+    return True
+
+async def play_session(front_end, table):
+    """ Plays rounds at the table until the player quits, disconnects or
+    runs out of money.
+
+    OUTPUT: number of rounds played
+
+    """
+
+    dealer = table.dealer
+    player = table.seats[0]
+    dealer.new_deck()
+    rounds = 0
+
+    while True:
+        front_end.show(f"Wallet: ${player.wallet}")
+        bets = valid_bets(player.wallet)
+        if not bets:
+            front_end.show("Insufficient funds, GAME OVER.")
+            return rounds
+        answer = await front_end.ask('bet', bets + [QUIT])
+        if answer is None or answer == QUIT:
+            return rounds
+
+        table.place_bets([int(answer)])
+        table.deal()
+        front_end.show(f"Dealer showing -> {dealer.curr_hand.cards[0]}")
+        if not (dealer.has_blackjack() or player.has_blackjack()):
+            while True:
+                if not await play_hand(front_end, dealer, player):
+                    return rounds
+                if not player.has_next_hand():
+                    break
+                player.set_next_hand()
+                dealer.deal_card(player)
+            table.play_dealer()
+
+        front_end.show("Dealer's " + dealer.curr_hand.cards_text())
+        for num, result in enumerate(table.settle()[0], 1):
+            player.cash_in_bet(result.bet, result.multiplier)
+            front_end.show(f"Hand {num}: {result.outcome.value} {result.net:+}")
+        dealer.end_round()
+        rounds += 1
+
+class Server():
+    """Accepts connections and runs a session at a new table for each one."""
+
+    def __init__(self, seed=None):
+        self.rng = Random(seed) # seeds the dealer of every new table
+        self.sessions = 0
+        self.rounds = 0
+
+    async def handle(self, reader, writer):
+        """ runs one connection's session from start to finish """
+
+        self.sessions += 1
+        table = blackjack_table.Table(1, blackjack.Dealer(Random(self.rng.getrandbits(64))))
+        try:
+            self.rounds += await play_session(LineFrontEnd(reader, writer), table)
+            writer.write(b"bye\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def serve(self, host, port):
+        """ serves until cancelled """
+        server = await asyncio.start_server(self.handle, host, port, limit=2 ** 12, backlog=4096)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    """ Command line entry point for the server """
+
+    parser = argparse.ArgumentParser(description="Serve blackjack tables over a line protocol.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8021)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    try:
+        asyncio.run(Server(args.seed).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
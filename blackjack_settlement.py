@@ -0,0 +1,79 @@
+""" Settlement of player hands against the dealer
+
+Works out the result of every hand a player holds at the end of a round
+without printing anything, so the same rules serve the interactive game,
+the simulators and anything else that needs to pay out bets.
+
+The dealer's hand is only examined once per round, however many hands the
+player holds.
+
+"""
+
+from collections import namedtuple
+from enum import Enum
+
+
+class Outcome(Enum):
+    """ result of a single player hand """
+    BLACKJACK = 'blackjack'
+    WIN = 'win'
+    PUSH = 'push'
+    LOSE = 'lose'
+    SURRENDER = 'surrender'
+
+# amount returned to the player per unit bet, as passed to cash_in_bet()
+PAYOUTS = {
+    Outcome.BLACKJACK: 2.5,
+    Outcome.WIN: 2,
+    Outcome.PUSH: 1,
+    Outcome.LOSE: 0,
+    Outcome.SURRENDER: 0.5,
+    }
+
+HandResult = namedtuple('HandResult', ['outcome', 'bet', 'multiplier', 'net'])
+
+
+def hand_outcome(hand, dealer_blackjack, dealer_bust, dealer_value):
+    """ Works out the outcome of one hand against an already examined dealer hand.
+
+    A dealer blackjack beats everything but a player blackjack, surrendered
+    hands included, and a bust player hand loses even if the dealer busts too.
+
+    OUTPUT: Outcome
+
+    """
+
+    player_blackjack = hand.is_blackjack()
+    if dealer_blackjack:
+        return Outcome.PUSH if player_blackjack else Outcome.LOSE
+    if player_blackjack:
+        return Outcome.BLACKJACK
+    if hand.surrendered:
+        return Outcome.SURRENDER
+    if hand.is_bust():
+        return Outcome.LOSE
+    if dealer_bust or hand.value > dealer_value:
+        return Outcome.WIN
+    if hand.value == dealer_value:
+        return Outcome.PUSH
+    return Outcome.LOSE
+
+def settle(hands, dealer_hand, payouts=PAYOUTS):
+    """ Settles all of a player's hands against the dealer's hand in one pass.
+
+    INPUT: list of the player's Hands, the dealer's Hand, amount returned
+    per unit bet for each Outcome (the table's Rules.payouts)
+    OUTPUT: list of HandResult, one per hand in the same order
+
+    """
+
+    dealer_blackjack = dealer_hand.is_blackjack()
+    dealer_bust = dealer_hand.is_bust()
+    dealer_value = dealer_hand.value
+
+    results = []
+    for hand in hands:
+        outcome = hand_outcome(hand, dealer_blackjack, dealer_bust, dealer_value)
+        multiplier = payouts[outcome]
+        results.append(HandResult(outcome, hand.bet, multiplier, hand.bet * (multiplier - 1)))
+    return results
@@ -0,0 +1,522 @@
+""" Headless blackjack simulation
+
+Plays rounds with the Dealer, Player and Hand classes from the blackjack
+module without any prompts, printing or sleeps. Decisions are made by a
+strategy callable so different playing strategies can be compared.
+
+A strategy is called as strategy(hand, upcard, can_double_down, can_split)
+where hand is the player's current Hand, upcard is the dealer's face up
+Card and the two flags say which optional actions are allowed. It must
+return one of STAND, HIT, DOUBLE or SPLIT, or SURRENDER when the rules
+offer it on the hand.
+
+Playing every card through the game's objects costs speed: one core plays
+around 55,000 rounds a second. Runs that need hundreds of thousands of
+rounds a second or more should use simulate_parallel() across cores.
+blackjack_vector.simulate() plays about two million rounds a second on one
+core, but it is no drop in replacement for this engine: it never splits,
+playing pairs as their total, and deals every round from a fresh shoe, so
+its house edge differs. blackjack_vector.crosscheck() only confirms that
+both settle the same cards alike.
+
+"""
+
+import hashlib
+import os
+from collections import Counter
+from random import Random
+from time import perf_counter
+
+import blackjack
+import blackjack_checkpoint
+import blackjack_instrument
+from blackjack_settlement import Outcome, settle
+from blackjack_stats import RunningStats, hand_type
+
+# actions use the same codes as the options offered by play_options()
+STAND = '1'
+HIT = '2'
+DOUBLE = '3'
+SPLIT = '4'
+SURRENDER = '5' # only offered by rules with surrender, see Player.can_surrender()
+
+SHARD_ROUNDS = 100000 # rounds played by each unit of work in a parallel run
+CHECK_ROUNDS = 1000 # rounds between checks of the precision reached
+MIN_ROUNDS = 1000 # rounds before the confidence interval is trusted to stop a run
+CHECKPOINT_SECONDS = 5 # time between checkpoints of a run that keeps them
+
+
+class SimulationResult():
+    """Aggregated results of a batch of simulated rounds.
+
+    Net amounts are from the player's point of view, so a positive
+    house edge means the house is winning. The net result of every round
+    per unit of its opening bet is kept as a RunningStats, overall and by
+    the type of the opening hand, so results take the same memory however
+    many rounds they count and can be merged exactly.
+
+    """
+
+    def __init__(self):
+        self.rounds = 0
+        self.initial_bets = 0 # sum of the opening bet of every round
+        self.wagered = 0 # everything put on the table, doubles and splits included
+        self.net = 0
+        self.per_unit = RunningStats() # net result per unit of opening bet
+        self.hand_types = {} # opening hand type -> RunningStats of the net per unit bet
+        self.outcomes = Counter()
+
+    def add_round(self, bet, wagered, net, hand_type=None):
+        """ record the result of a single round """
+        self.rounds += 1
+        self.initial_bets += bet
+        self.wagered += wagered
+        self.net += net
+        self.per_unit.add(net / bet)
+        if hand_type is not None:
+            if hand_type not in self.hand_types:
+                self.hand_types[hand_type] = RunningStats()
+            self.hand_types[hand_type].add(net / bet)
+
+    def add_results(self, bet, results, hand_type=None):
+        """ record a round straight from its settlement
+
+        INPUT: opening bet, list of HandResult from blackjack_settlement.settle(),
+        type of the opening hand from blackjack_stats.hand_type()
+
+        """
+
+        wagered, net, outcomes = tally(results)
+        self.add_round(bet, wagered, net, hand_type)
+        self.outcomes.update(outcomes)
+
+    def merge(self, other):
+        """ adds the results of another SimulationResult to this one """
+        self.rounds += other.rounds
+        self.initial_bets += other.initial_bets
+        self.wagered += other.wagered
+        self.net += other.net
+        self.per_unit.merge(other.per_unit)
+        for kind, stats in other.hand_types.items():
+            self.hand_types.setdefault(kind, RunningStats()).merge(stats)
+        self.outcomes.update(other.outcomes)
+        return self
+
+    @property
+    def house_edge(self):
+        """ expected loss per unit of initial bet """
+        if not self.initial_bets:
+            return 0.0
+        return -self.net / self.initial_bets
+
+    @property
+    def variance(self):
+        """ variance of the net result of a round per unit of opening bet """
+        return self.per_unit.variance
+
+    def edge_interval(self, confidence=0.95):
+        """ confidence interval on the house edge, as a tuple of (low, high) """
+        half_width = self.per_unit.half_width(confidence)
+        return self.house_edge - half_width, self.house_edge + half_width
+
+    def precise_enough(self, width, confidence=0.95):
+        """ True once the confidence interval on the house edge is no wider than width """
+        return self.rounds >= MIN_ROUNDS and 2 * self.per_unit.half_width(confidence) <= width
+
+    def hand_type_report(self):
+        """ expected result per unit bet of every opening hand type, as text """
+
+        string = ""
+        for kind, stats in sorted(self.hand_types.items(), key=lambda item: item[1].mean):
+            string += f"{kind:>13}: {stats.mean:+.4f} +/- {stats.std_error:.4f} ({stats.count} rounds)\n"
+        return string
+
+    def __str__(self):
+        low, high = self.edge_interval()
+        string = f"Rounds: {self.rounds}\n"
+        string += f"House edge: {self.house_edge:.4%} (95% CI {low:.4%} to {high:.4%})\n"
+        string += f"Variance per round: {self.variance:.4f}\n"
+        for outcome in Outcome:
+            string += f"{outcome.value}: {self.outcomes[outcome.value]}\n"
+        return string
+
+
+def basic_strategy(hand, upcard, can_double_down, can_split):
+    """ Basic strategy for the Vegas Strip rules (six decks, dealer
+    stands on soft 17, double after split allowed). The dealer only peeks
+    under an ace, so against a ten 11 is hit rather than doubled and 8s
+    are not split, as blackjack_strategy.build_table() works out.
+
+    """
+
+    up = 11 if upcard.value == 1 else upcard.value
+    value = hand.value
+
+    if can_split:
+        pair = hand.cards[0].value
+        if (pair == 1 or (pair == 8 and up != 10)
+                or (pair in (2, 3, 7) and up <= 7)
+                or (pair == 6 and up <= 6)
+                or (pair == 4 and up in (5, 6))
+                or (pair == 9 and up not in (7, 10, 11))):
+            return SPLIT
+
+    if hand.is_soft:
+        if value >= 19:
+            return STAND
+        if value == 18:
+            if 3 <= up <= 6:
+                return DOUBLE if can_double_down else STAND
+            return STAND if up <= 8 else HIT
+        if ((value == 17 and 3 <= up <= 6)
+                or (value in (15, 16) and 4 <= up <= 6)
+                or (value in (13, 14) and up in (5, 6))):
+            return DOUBLE if can_double_down else HIT
+        return HIT
+
+    if value >= 17:
+        return STAND
+    if value >= 13:
+        return STAND if up <= 6 else HIT
+    if value == 12:
+        return STAND if 4 <= up <= 6 else HIT
+    if ((value == 11 and up <= 9)
+            or (value == 10 and up <= 9)
+            or (value == 9 and 3 <= up <= 6)):
+        return DOUBLE if can_double_down else HIT
+    return HIT
+
+def dealer_strategy(hand, upcard, can_double_down, can_split):
+    """ Mimics the dealer: hit below 17 and never double or split """
+    return HIT if hand.value < 17 else STAND
+
+STRATEGIES = {
+    'basic': basic_strategy,
+    'dealer': dealer_strategy,
+    }
+
+def hand_decisions(dealer, player):
+    """ Plays out the player's current hand one decision at a time.
+
+    A generator, so the same rules serve callers that decide straight away
+    and callers that have to wait for an answer, such as the server. It
+    yields (can_double_down, can_split) whenever the hand needs a decision
+    and must be sent the action chosen, one of the action codes. It
+    finishes once the hand is done.
+
+    """
+
+    hand = player.curr_hand
+    if hand.is_split and hand.cards[0].value == 1:
+        return # split aces only receive one card
+
+    while hand.value < 21:
+        can_double_down = player.can_double_down()
+        can_split = player.can_split()
+        action = yield can_double_down, can_split
+
+        if action == STAND:
+            return
+        elif action == HIT:
+            dealer.deal_card(player)
+        elif action == DOUBLE and can_double_down:
+            player.double_down()
+            dealer.deal_card(player)
+            return
+        elif action == SPLIT and can_split:
+            player.split()
+            dealer.deal_card(player)
+            if hand.cards[0].value == 1:
+                return
+        elif action == SURRENDER and player.can_surrender():
+            player.surrender()
+            return
+        else:
+            raise ValueError(f"strategy returned an invalid action: {action!r}")
+
+def next_decision(decisions, action=None):
+    """ Sends the action chosen to a hand_decisions() generator, or starts it
+    when no action is given. Only the generator finishing ends the hand, so a
+    StopIteration raised while choosing the action isn't mistaken for it.
+
+    OUTPUT: (can_double_down, can_split) of the next decision, or None once
+    the hand is done
+
+    """
+
+    try:
+        return decisions.send(action)
+    except StopIteration:
+        return None
+
+def play_hand(dealer, player, strategy, log=None):
+    """ Plays out the player's current hand using the strategy, recording
+    each action in the EventLog if one is given.
+
+    """
+
+    hand = player.curr_hand
+    upcard = dealer.curr_hand.cards[0]
+    decisions = hand_decisions(dealer, player)
+    options = next_decision(decisions)
+    while options is not None:
+        action = strategy(hand, upcard, *options)
+        if log is not None:
+            log.action(player, action)
+        options = next_decision(decisions, action)
+
+def play_hands(dealer, player, strategy, log=None):
+    """ Plays every hand the player holds, including those made by splits """
+
+    while True:
+        play_hand(dealer, player, strategy, log)
+        if not player.has_next_hand():
+            return
+        player.set_next_hand()
+        dealer.deal_card(player)
+
+def tally(results):
+    """ Adds up the settled hands of one player.
+
+    INPUT: list of HandResult from blackjack_settlement.settle()
+    OUTPUT: tuple of (amount wagered, net result, list of hand outcome names)
+
+    """
+
+    wagered = 0
+    net = 0
+    outcomes = []
+    for result in results:
+        wagered += result.bet
+        net += result.net
+        outcomes.append(result.outcome.value)
+    return wagered, net, outcomes
+
+def play_round(dealer, player, strategy, bet=1, log=None, result=None):
+    """ Plays a single round from the bet through to settlement.
+
+    INPUT: Dealer, Player, strategy callable, opening bet, optional EventLog,
+    optional SimulationResult to record the settled round in
+    OUTPUT: tuple of (opening bet, amount wagered, net result, list of
+    hand outcome names)
+
+    """
+
+    player.discard_hands()
+    dealer.discard_hand()
+    player.place_bet(bet)
+    opening_bet = player.curr_hand.bet # the player's bet hook may have changed it
+    player.wallet = player.rules.wallet_needed(opening_bet)
+    if log is not None:
+        log.round_started([player])
+
+    # in table order, as blackjack_table.Table.deal(): player, upcard, player, hole card
+    dealer.deal_card(player)
+    dealer.deal_card(dealer)
+    dealer.deal_card(player)
+    dealer.deal_card(dealer)
+    opening_type = hand_type(player.curr_hand)
+
+    if not (dealer.has_blackjack() or player.has_blackjack()):
+        play_hands(dealer, player, strategy, log)
+        if not all(hand.is_bust() for hand in player.hands):
+            while dealer.should_hit():
+                dealer.deal_card(dealer)
+
+    results = settle(player.hands, dealer.curr_hand, dealer.rules.payouts)
+    if log is not None:
+        log.settled(player, results)
+    wagered, net, outcomes = tally(results)
+    if result is not None:
+        result.add_round(opening_bet, wagered, net, opening_type)
+        result.outcomes.update(outcomes)
+    return opening_bet, wagered, net, outcomes
+
+def simulate(strategy, rounds, bet=1, dealer=None, player=None, seed=None, log=None,
+             precision=None, confidence=0.95, checkpoint=None, resume=False):
+    """ Plays a number of rounds without any user interaction.
+
+    With a precision the run stops early, at the first check after the
+    confidence interval on the house edge has become no wider than it.
+
+    With a checkpoint path the state of the run is saved there every
+    CHECKPOINT_SECONDS and when it ends. A resumed run carries on from the
+    saved state and gives exactly the results of an uninterrupted one;
+    rounds already written to an EventLog after the checkpoint are logged
+    again. The EventLog is detached from the dealer once the run ends, so
+    the dealer can be used again after the log is closed.
+
+    INPUT: strategy callable, number of rounds (int), opening bet per round,
+    optional seed to make the shuffles reproducible, optional EventLog,
+    optional width of confidence interval to stop at, its confidence level,
+    optional checkpoint path, whether to resume from it
+    OUTPUT: SimulationResult
+
+    """
+
+    dealer = dealer or blackjack.Dealer(Random(seed))
+    player = player or blackjack.Player(dealer.rules)
+    result = SimulationResult()
+    played = 0
+    if log is not None:
+        log.attach(dealer, [player])
+        if seed is not None:
+            log.seed(seed)
+    try:
+        if dealer.deck is None:
+            dealer.new_deck()
+        if resume:
+            state = blackjack_checkpoint.load(checkpoint, 'simulation')
+            result, played = blackjack_checkpoint.restore(state, dealer, player, bet, strategy)
+
+        saved = perf_counter()
+        for played in range(played + 1, rounds + 1):
+            play_round(dealer, player, strategy, bet, log, result)
+            dealer.end_round()
+            if played % CHECK_ROUNDS == 0:
+                if precision is not None and result.precise_enough(precision, confidence):
+                    break
+                if checkpoint is not None and perf_counter() - saved >= CHECKPOINT_SECONDS:
+                    blackjack_checkpoint.save(checkpoint, blackjack_checkpoint.capture(
+                        dealer, player, result, played, bet, strategy))
+                    saved = perf_counter()
+        if checkpoint is not None:
+            blackjack_checkpoint.save(checkpoint, blackjack_checkpoint.capture(
+                dealer, player, result, result.rounds, bet, strategy))
+    finally:
+        if log is not None:
+            log.flush()
+            log.detach(dealer)
+    return result
+
+def derive_seed(master_seed, shard):
+    """ Derives the seed of one shard from the master seed of a run.
+
+    The seed only depends on the master seed and the shard number, so a
+    run gives the same result whatever the number of worker processes.
+
+    """
+
+    digest = hashlib.sha256(f"{master_seed}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+def _simulate_shard(args):
+    """ Runs one shard of a parallel simulation in a worker process """
+    strategy, rounds, bet, seed = args
+    return simulate(strategy, rounds, bet, seed=seed)
+
+def simulate_parallel(strategy, rounds, bet=1, seed=0, workers=None, precision=None,
+                      confidence=0.95, checkpoint=None, resume=False):
+    """ Splits a simulation into shards and plays them on all cores.
+
+    Every shard plays its own shoes with a generator seeded from the master
+    seed, and the shard results are merged in order, so a run is
+    reproducible for a given seed. The strategy must be picklable, e.g. a
+    module level function. With a precision the run stops after the first
+    shard that brings the confidence interval on the house edge down to it.
+    With a checkpoint path the merged result is saved after every shard,
+    and a resumed run only plays the shards that are left.
+
+    INPUT: strategy callable, number of rounds (int), opening bet per round,
+    master seed, number of worker processes (defaults to all cores),
+    optional width of confidence interval to stop at, its confidence level,
+    optional checkpoint path, whether to resume from it
+    OUTPUT: SimulationResult
+
+    """
+
+    from multiprocessing import Pool # only parallel runs pay for importing it
+
+    shards = []
+    for shard, start in enumerate(range(0, rounds, SHARD_ROUNDS)):
+        shard_rounds = min(SHARD_ROUNDS, rounds - start)
+        shards.append((strategy, shard_rounds, bet, derive_seed(seed, shard)))
+    sizes = [shard[1] for shard in shards]
+    name = blackjack_checkpoint.strategy_name(strategy)
+
+    result = SimulationResult()
+    done = 0
+    if resume:
+        state = blackjack_checkpoint.load(checkpoint, 'parallel')
+        done = len(state['shard_rounds'])
+        # the shards already played must be the ones this run would play
+        blackjack_checkpoint.check(state, seed=seed, bet=bet, strategy=name, shard_rounds=sizes[:done])
+        result = state['result']
+
+    with Pool(workers or os.cpu_count()) as pool:
+        for shard_result in pool.imap(_simulate_shard, shards[done:]):
+            result.merge(shard_result)
+            done += 1
+            if checkpoint is not None:
+                blackjack_checkpoint.save(checkpoint, {'kind': 'parallel', 'seed': seed, 'bet': bet,
+                                                       'strategy': name, 'shard_rounds': sizes[:done],
+                                                       'result': result})
+            if precision is not None and result.precise_enough(precision, confidence):
+                break # leaving the block stops the remaining shards
+    return result
+
+def main():
+    """ Command line entry point for running a simulation """
+
+    import argparse # command line only modules aren't imported by library users
+    import cProfile
+    import json
+
+    parser = argparse.ArgumentParser(description="Simulate blackjack rounds.")
+    parser.add_argument('rounds', type=int, help="number of rounds to play, at most when --precision is given")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='basic')
+    parser.add_argument('--bet', type=int, default=1)
+    parser.add_argument('--seed', type=int, help="master seed for reproducible runs")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes, 0 for one per core")
+    parser.add_argument('--precision', type=float,
+                        help="stop once the confidence interval on the house edge is this wide, e.g. 0.001")
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help="confidence level of the interval for --precision")
+    parser.add_argument('--by-hand', action='store_true',
+                        help="also print the expected result of every opening hand type")
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help="save the state of the run to FILE every few seconds")
+    parser.add_argument('--resume', action='store_true',
+                        help="carry on from the state saved in the --checkpoint file")
+    parser.add_argument('--instrument', action='store_true',
+                        help="count and time the hot paths and print the numbers as JSON")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="write cProfile statistics of the run to FILE, for pstats")
+    args = parser.parse_args()
+    if (args.instrument or args.profile) and args.workers != 1:
+        parser.error("--instrument and --profile only measure single process runs")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs the --checkpoint file to resume from")
+
+    strategy = STRATEGIES[args.strategy]
+    if args.instrument:
+        blackjack_instrument.enable()
+        strategy = blackjack_instrument.timed('strategy', strategy)
+    profiler = cProfile.Profile() if args.profile else None
+    start = perf_counter()
+    if args.workers == 1:
+        if profiler is not None:
+            profiler.enable()
+        result = simulate(strategy, args.rounds, args.bet, seed=args.seed,
+                          precision=args.precision, confidence=args.confidence,
+                          checkpoint=args.checkpoint, resume=args.resume)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+    else:
+        seed = 0 if args.seed is None else args.seed
+        result = simulate_parallel(strategy, args.rounds, args.bet, seed, args.workers or None,
+                                   args.precision, args.confidence, args.checkpoint, args.resume)
+    elapsed = perf_counter() - start
+    if args.instrument:
+        blackjack_instrument.disable()
+    print(result)
+    if args.by_hand:
+        print(result.hand_type_report())
+    print(f"{result.rounds / elapsed:,.0f} rounds per second")
+    if args.instrument:
+        print(json.dumps(blackjack_instrument.snapshot(), indent=2))
+
+if __name__ == '__main__':
+    main()
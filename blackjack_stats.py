@@ -0,0 +1,104 @@
+""" Streaming statistics for simulations
+
+RunningStats keeps the count, mean and sum of squared deviations of a
+stream of values with Welford's update, so the variance stays accurate
+over billions of rounds and the memory used never grows. Accumulators
+from separate workers or batches are combined exactly with merge().
+
+Hand types name the opening two card hand of a round ('hard 16', 'soft
+18', 'pair of 8s', 'blackjack'), so results can be broken down by the
+hand the player was dealt. There are only a few dozen of them, however
+many rounds are played.
+
+"""
+
+from math import sqrt
+
+import blackjack_handstate as handstate
+
+
+class RunningStats():
+    """Count, mean and variance of a stream of values, in constant memory."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # sum of squared deviations from the mean
+
+    def add(self, value):
+        """ records one value """
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def add_batch(self, count, mean, m2):
+        """ records a batch of values given by its count, mean and sum of
+        squared deviations from its mean
+
+        """
+
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def merge(self, other):
+        """ adds the values of another RunningStats to this one """
+        self.add_batch(other.count, other.mean, other.m2)
+        return self
+
+    @property
+    def variance(self):
+        """ sample variance of the values """
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std_error(self):
+        """ standard error of the mean """
+        if self.count < 2:
+            return float('inf')
+        return sqrt(self.variance / self.count)
+
+    def half_width(self, confidence=0.95):
+        """ half the width of the normal confidence interval on the mean """
+        return z_score(confidence) * self.std_error
+
+    def __repr__(self):
+        return f"RunningStats(count={self.count}, mean={self.mean!r}, m2={self.m2!r})"
+
+
+def z_score(confidence):
+    """ number of standard errors each side of the mean for a two sided interval """
+
+    from statistics import NormalDist # only paid for by runs that ask for intervals
+
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be between 0 and 1, not {confidence}")
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+def _hand_type(state):
+    """ name of the opening hand a two card state stands for """
+
+    total = handstate.TOTAL[state]
+    if state & handstate.BLACKJACK:
+        return 'blackjack'
+    if handstate.PAIR[state]:
+        return 'pair of aces' if handstate.SOFT[state] else f"pair of {total // 2}s"
+    if handstate.SOFT[state]:
+        return f"soft {total}"
+    return f"hard {total}"
+
+# hand type of every state, indexed by state, for two card hands only
+HAND_TYPES = [_hand_type(state) if handstate.COUNT[state] == 2 else None
+              for state in range(len(handstate.TOTAL))]
+
+def hand_type(hand):
+    """ name of the type of a two card Hand, e.g. 'soft 17' or 'pair of 8s' """
+    return HAND_TYPES[hand.state]
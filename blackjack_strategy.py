@@ -0,0 +1,472 @@
+""" Strategy table generator
+
+Works out the best action (stand, hit, double down, split or, where the
+rules offer it, surrender) for every player hand against every dealer
+upcard under a blackjack_rules.Rules, the
+Vegas Strip rules of the blackjack module by default, and stores the
+result as a StrategyTable.
+
+Each expected value is computed from the shoe composition left after the
+player's two cards and the dealer's upcard are dealt, with exact dealer
+probabilities from blackjack_odds. The player's later draws are taken from
+that same composition.
+
+Splits are valued under the module's split rules by a SplitEvaluator: up
+to the most hands the rules allow, resplits of any pair but aces, one card
+to each split ace and doubling after a split if the rules allow it, with
+21 on a split hand never counting as blackjack. The value is an
+approximation, as only the pair cards drawn for resplits are taken out of
+the shoe later split hands draw from, not the other cards earlier hands
+drew. action_values() uses the same evaluators to value every action open
+to a player's current hand mid round.
+
+A StrategyTable can be saved to a small binary file and loaded back in a
+few milliseconds. It is itself a strategy for blackjack_sim: calling it
+with (hand, upcard, can_double_down, can_split) is a couple of list
+lookups.
+
+"""
+
+import os
+import struct
+
+import blackjack_handstate as handstate
+import blackjack_odds as odds
+from blackjack_rules import VEGAS_STRIP
+from blackjack_settlement import Outcome
+from blackjack_sim import STAND, HIT, DOUBLE, SPLIT, SURRENDER
+
+ACTION_NAMES = {
+    STAND: 'Stand',
+    HIT: 'Take hit',
+    DOUBLE: 'Double down',
+    SPLIT: 'Split hand',
+    SURRENDER: 'Surrender',
+    }
+
+NO_SPLIT = '0' # pair rows hold this when the pair should be played as a total
+
+# rows of the table: hard 4-21, soft 12-21, then pairs of aces to tens
+HARD_ROWS = 0
+SOFT_ROWS = 18
+PAIR_ROWS = 28
+ROWS = 38
+
+MAGIC = b'BJST'
+VERSION = 2 # version 1 tables were built without resplits
+HEADER = struct.Struct('<4sB')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'basic_strategy.bin')
+
+
+class StrategyTable():
+    """Best action for every hand and upcard, looked up in O(1).
+
+    Every cell holds two action codes, the best action and the better of
+    standing and hitting, played when the best action isn't allowed.
+    Surrender is only ever best in tables built for rules that offer it,
+    and those offer it on the first two cards of an unsplit hand.
+
+    """
+
+    def __init__(self, cells):
+        self.cells = cells # list of one character action codes
+
+    def action(self, hand, upcard, can_double_down, can_split):
+        """ returns the action to take for the hand against the upcard """
+
+        up = upcard.value
+        if can_split:
+            if self.cells[((PAIR_ROWS + hand.cards[0].value - 1) * 10 + up - 1) * 2] == SPLIT:
+                return SPLIT
+        if hand.is_soft:
+            row = SOFT_ROWS + hand.value - 12
+        else:
+            row = HARD_ROWS + max(hand.value, 4) - 4
+        index = (row * 10 + up - 1) * 2
+        action = self.cells[index]
+        if action == DOUBLE and not can_double_down:
+            return self.cells[index + 1]
+        if action == SURRENDER and (handstate.COUNT[hand.state] != 2 or handstate.SPLIT[hand.state]):
+            return self.cells[index + 1]
+        return action
+
+    __call__ = action
+
+    def save(self, path):
+        """ writes the table to a binary file """
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION))
+            file.write(''.join(self.cells).encode('ascii'))
+
+    @classmethod
+    def load(cls, path):
+        """ reads a table written by save() """
+
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a strategy table file")
+        cells = list(data[HEADER.size:].decode('ascii'))
+        if len(cells) != ROWS * 10 * 2:
+            raise ValueError(f"{path} is truncated")
+        return cls(cells)
+
+
+def stand_ev(total, dealer):
+    """ Expected value of standing on a total.
+
+    INPUT: player's total, dealer outcome probabilities from blackjack_odds
+    OUTPUT: expected net result per unit bet
+
+    """
+
+    if total > 21:
+        return -1.0
+    ev = dealer[odds.BUST] - dealer[odds.BLACKJACK]
+    for index, dealer_total in enumerate(range(17, 22)):
+        if total > dealer_total:
+            ev += dealer[index]
+        elif total < dealer_total:
+            ev -= dealer[index]
+    return ev
+
+
+class HandEvaluator():
+    """Expected values of the actions for one upcard and shoe composition.
+
+    Results are memoized by hand state, so every state is only worked out
+    once per evaluator.
+
+    """
+
+    def __init__(self, upcard, shoe, rules=None):
+        self.upcard = upcard
+        self.shoe = shoe
+        self.rules = rules or VEGAS_STRIP
+        remaining = sum(shoe)
+        self.probabilities = [(value, count / remaining)
+                              for value, count in enumerate(shoe, 1) if count]
+        self.dealer = odds.dealer_probabilities(upcard, shoe, hit_soft_17=self.rules.hit_soft_17)
+        self._stand = {}
+        self._hit = {}
+
+    def stand(self, state):
+        """ expected value of standing """
+        if state not in self._stand:
+            self._stand[state] = stand_ev(handstate.TOTAL[state], self.dealer)
+        return self._stand[state]
+
+    def hit(self, state):
+        """ expected value of taking a card, then playing on as well as possible """
+
+        if state not in self._hit:
+            ev = 0.0
+            for value, probability in self.probabilities:
+                next_state = handstate.TRANSITIONS[state * 11 + value]
+                if next_state & handstate.BUST:
+                    ev -= probability
+                else:
+                    ev += probability * max(self.stand(next_state), self.hit(next_state))
+            self._hit[state] = ev
+        return self._hit[state]
+
+    def double(self, state):
+        """ expected value of doubling the bet and taking exactly one card """
+
+        ev = 0.0
+        for value, probability in self.probabilities:
+            ev += probability * self.stand(handstate.TRANSITIONS[state * 11 + value])
+        return 2 * ev
+
+    def surrender(self):
+        """ Expected value of giving up the hand for half the bet back. A
+        dealer blackjack the dealer hasn't peeked for still takes the whole bet.
+
+        """
+
+        blackjack = self.dealer[odds.BLACKJACK]
+        return (self.rules.payouts[Outcome.SURRENDER] - 1) * (1 - blackjack) - blackjack
+
+    def best(self, state, can_double_down=True):
+        """ expected value of the best of standing, hitting and, if allowed, doubling """
+        if can_double_down:
+            return max(self.stand(state), self.hit(state), self.double(state))
+        return max(self.stand(state), self.hit(state))
+
+    def split(self, pair_value):
+        """ expected value of splitting a pair, resplits included, per
+        original bet
+
+        """
+
+        return SplitEvaluator(self, pair_value).value()
+
+
+class SplitEvaluator():
+    """Expected value of splitting a pair, with every resplit allowed by the rules.
+
+    A split is worked out as a recursion over (hands still waiting for
+    their second card, hands on the table). Every waiting hand holds a lone
+    card of the pair value. It either draws a card it plays out as well as
+    possible, or draws another card of the pair value and is resplit if
+    that is better and the table has room. Each (waiting, hands) state is
+    only worked out once.
+
+    The pair cards drawn for resplits are taken out of the shoe the
+    following hands draw from. Other cards drawn by earlier hands are not,
+    as in HandEvaluator.
+
+    """
+
+    def __init__(self, evaluator, pair_value, hands=1, waiting=0):
+        """ INPUT: HandEvaluator for the shoe at the time of the split, value
+        of the pair, number of hands the player holds before splitting, number
+        of those still waiting for their second card
+
+        """
+
+        self.pair_value = pair_value
+        self.hands = hands
+        self.waiting = waiting
+        self.max_hands = evaluator.rules.max_hands
+        self.double_after_split = evaluator.rules.double_after_split
+        self.start = handstate.next_state(handstate.SPLIT_EMPTY, pair_value)
+        self._evaluators = [evaluator] # indexed by the pair cards drawn since
+        self._values = {}
+
+    def evaluator(self, drawn):
+        """ HandEvaluator for the shoe left once more cards of the pair value are drawn """
+
+        while len(self._evaluators) <= drawn:
+            first = self._evaluators[0]
+            shoe = odds.remove_cards(first.shoe, [self.pair_value] * len(self._evaluators))
+            if min(shoe) < 0:
+                raise ValueError("shoe composition has no cards left to resplit")
+            self._evaluators.append(HandEvaluator(first.upcard, shoe, first.rules))
+        return self._evaluators[drawn]
+
+    def play_out(self, waiting, hands, drawn=0):
+        """ Expected value of every waiting hand, per unit bet on each.
+
+        INPUT: number of hands waiting for their second card, number of
+        hands on the table, cards of the pair value drawn for resplits so far
+        OUTPUT: expected net result summed over the waiting hands
+
+        """
+
+        if not waiting:
+            return 0.0
+        key = (waiting, hands, drawn)
+        if key not in self._values:
+            evaluator = self.evaluator(drawn)
+            rest = self.play_out(waiting - 1, hands, drawn)
+            can_resplit = self.pair_value != 1 and hands < self.max_hands
+            ev = 0.0
+            for value, probability in evaluator.probabilities:
+                state = handstate.TRANSITIONS[self.start * 11 + value]
+                if self.pair_value == 1:
+                    hand_ev = evaluator.stand(state) + rest # split aces take one card
+                else:
+                    hand_ev = evaluator.best(state, self.double_after_split) + rest
+                if can_resplit and value == self.pair_value:
+                    hand_ev = max(hand_ev, self.play_out(waiting + 1, hands + 1, drawn + 1))
+                ev += probability * hand_ev
+            self._values[key] = ev
+        return self._values[key]
+
+    def value(self):
+        """ expected value of splitting, summed over the two hands made by
+        the split and any hands already waiting
+
+        """
+
+        return self.play_out(self.waiting + 2, self.hands + 1)
+
+    def waiting_value(self):
+        """ expected value of the hands already waiting if the pair is not split """
+        return self.play_out(self.waiting, self.hands)
+
+
+def action_values(player, dealer):
+    """ Expected value of every action open to the player's current hand,
+    from the cards left in the dealer's deck. The dealer's hole card counts
+    as unseen.
+
+    Split hands still waiting for their second card are included, since
+    splitting again uses up room they could have resplit into.
+
+    INPUT: Player, Dealer in the middle of a round
+    OUTPUT: dict of action code -> expected net result per unit of the
+    current hand's bet
+
+    """
+
+    hand = player.curr_hand
+    upcard = dealer.curr_hand.cards[0].value
+    shoe = list(odds.composition(dealer.deck))
+    for card in dealer.curr_hand.cards[1:]:
+        shoe[card.value - 1] += 1
+    evaluator = HandEvaluator(upcard, tuple(shoe), dealer.rules)
+
+    pair_value = hand.cards[0].value
+    waiting = sum(len(other.cards) == 1 for other in player.hands[player.index_curr_hand + 1:])
+    splits = SplitEvaluator(evaluator, pair_value, len(player.hands), waiting)
+    rest = splits.waiting_value()
+
+    state = hand.state
+    if hand.is_split and pair_value == 1:
+        return {STAND: evaluator.stand(state) + rest}
+    values = {
+        STAND: evaluator.stand(state) + rest,
+        HIT: evaluator.hit(state) + rest,
+        }
+    if player.can_double_down():
+        values[DOUBLE] = evaluator.double(state) + rest
+    if player.can_split():
+        values[SPLIT] = splits.value()
+    if player.can_surrender():
+        values[SURRENDER] = evaluator.surrender()
+    return values
+
+def split_table(shoe=None, rules=None):
+    """ Expected value of splitting every pair against every upcard.
+
+    INPUT: composition of the shoe before any card is dealt (a full shoe
+    if None), blackjack_rules.Rules
+    OUTPUT: dict of (pair value, upcard) -> expected net result per original bet
+
+    """
+
+    rules = rules or VEGAS_STRIP
+    shoe = shoe or rules.composition
+    table = {}
+    for upcard in range(1, 11):
+        after_upcard = odds.remove_cards(shoe, [upcard])
+        for pair_value in range(1, 11):
+            evaluator = HandEvaluator(upcard, odds.remove_cards(after_upcard, [pair_value] * 2), rules)
+            table[pair_value, upcard] = evaluator.split(pair_value)
+    return table
+
+
+def _best(evs):
+    """ returns the best action and the best action without doubling down """
+    best = max(evs, key=evs.get)
+    no_double = STAND if evs[STAND] >= evs[HIT] else HIT
+    return best, no_double
+
+def _representative_state(total, soft):
+    """ a three card state with the given total, for rows no two card hand reaches """
+
+    for state, state_total in enumerate(handstate.TOTAL):
+        if (state_total == total and handstate.SOFT[state] == soft
+                and handstate.COUNT[state] == 3 and not handstate.SPLIT[state]):
+            return state
+    raise ValueError(f"no hand state for total {total}")
+
+def build_table(shoe=None, split_ev=None, rules=None):
+    """ Works out the strategy table for a shoe composition.
+
+    INPUT: composition of the shoe before any card is dealt (a full shoe
+    if None), optional function split_ev(evaluator, pair_value) for the
+    value of splitting, blackjack_rules.Rules
+    OUTPUT: StrategyTable
+
+    """
+
+    rules = rules or VEGAS_STRIP
+    shoe = shoe or rules.composition
+    if split_ev is None:
+        split_ev = HandEvaluator.split
+    cells = [NO_SPLIT] * (ROWS * 10 * 2)
+
+    for upcard in range(1, 11):
+        after_upcard = odds.remove_cards(shoe, [upcard])
+        if min(after_upcard) < 0:
+            raise ValueError("shoe composition has no cards of the upcard value")
+        sums = {} # row -> action -> expected value weighted by how often the hand is dealt
+
+        for first in range(1, 11):
+            for second in range(first, 11):
+                weight = after_upcard[first - 1] * (after_upcard[second - 1] - (first == second))
+                if first != second:
+                    weight *= 2
+                state = handstate.hand_state([first, second])
+                if weight <= 0 or state & handstate.BLACKJACK:
+                    continue
+                evaluator = HandEvaluator(upcard, odds.remove_cards(after_upcard, [first, second]), rules)
+                evs = {
+                    STAND: evaluator.stand(state),
+                    HIT: evaluator.hit(state),
+                    DOUBLE: evaluator.double(state),
+                    }
+                if rules.surrender:
+                    evs[SURRENDER] = evaluator.surrender()
+                total = handstate.TOTAL[state]
+                if handstate.SOFT[state]:
+                    row = SOFT_ROWS + total - 12
+                else:
+                    row = HARD_ROWS + total - 4
+                row_sums = sums.setdefault(row, dict.fromkeys(evs, 0.0))
+                for action, ev in evs.items():
+                    row_sums[action] += weight * ev
+
+                if first == second:
+                    split = split_ev(evaluator, first)
+                    if split > max(evs.values()):
+                        cells[((PAIR_ROWS + first - 1) * 10 + upcard - 1) * 2] = SPLIT
+                        cells[((PAIR_ROWS + first - 1) * 10 + upcard - 1) * 2 + 1] = SPLIT
+
+        evaluator = HandEvaluator(upcard, after_upcard, rules)
+        for row in range(PAIR_ROWS):
+            if row in sums:
+                evs = sums[row]
+            else:
+                soft = row >= SOFT_ROWS
+                total = row - SOFT_ROWS + 12 if soft else row + 4
+                state = _representative_state(total, soft)
+                evs = {
+                    STAND: evaluator.stand(state),
+                    HIT: evaluator.hit(state),
+                    DOUBLE: evaluator.double(state),
+                    }
+            index = (row * 10 + upcard - 1) * 2
+            cells[index], cells[index + 1] = _best(evs)
+
+    return StrategyTable(cells)
+
+_default_table = None
+
+def default_table(path=DEFAULT_PATH):
+    """ Returns the table for a full six deck shoe, loading it from path if
+    it has been saved before, or building and saving it otherwise.
+
+    """
+
+    global _default_table
+    if _default_table is None:
+        try:
+            _default_table = StrategyTable.load(path)
+        except (OSError, ValueError): # missing, or saved by an older version
+            _default_table = build_table()
+            try:
+                _default_table.save(path)
+            except OSError:
+                pass # the table still works, it just isn't cached on disk
+    return _default_table
+
+_rules_tables = {} # Rules -> StrategyTable built for them, see rules_table()
+
+def rules_table(rules):
+    """ Returns the table for a blackjack_rules.Rules: the saved default
+    table for the Vegas Strip rules, and for any other rules a table built
+    the first time they are asked for.
+
+    """
+
+    if rules is VEGAS_STRIP:
+        return default_table()
+    if rules not in _rules_tables:
+        _rules_tables[rules] = build_table(rules=rules)
+    return _rules_tables[rules]
@@ -0,0 +1,118 @@
+""" Blackjack table
+
+A Table seats one to seven players against one dealer and one shoe. Cards
+are dealt in real table order: one card to every seat from the dealer's
+left, the dealer's upcard, a second card to every seat, then the dealer's
+hole card. The dealer plays a single hand for the whole table once every
+seat has finished.
+
+"""
+
+from random import Random
+
+import blackjack
+import blackjack_sim
+from blackjack_settlement import settle
+from blackjack_stats import hand_type
+
+
+class Table():
+    """One dealer and shoe shared by up to seven seated players."""
+
+    max_seats = 7
+
+    def __init__(self, seats=1, dealer=None, rules=None):
+        if not 1 <= seats <= Table.max_seats:
+            raise ValueError(f"a table seats 1 to {Table.max_seats} players, not {seats}")
+        self.dealer = dealer or blackjack.Dealer(rules=rules)
+        self.seats = [blackjack.Player(self.dealer.rules) for _ in range(seats)]
+
+    def place_bets(self, bets):
+        """ Clears the last round and places the opening bet of every seat.
+
+        INPUT: list with one bet per seat
+
+        """
+
+        self.dealer.discard_hand()
+        for player, amount in zip(self.seats, bets):
+            player.discard_hands()
+            player.place_bet(amount)
+
+    def deal(self):
+        """ deals two cards to every seat and to the dealer, in table order """
+
+        dealer = self.dealer
+        for _ in range(2):
+            for player in self.seats:
+                dealer.deal_card(player)
+            dealer.deal_card(dealer)
+
+    def dealer_needed(self):
+        """ checks if any seat has a hand the dealer's hand still has to beat """
+
+        for player in self.seats:
+            for hand in player.hands:
+                if not (hand.is_bust() or hand.is_blackjack()):
+                    return True
+        return False
+
+    def play_dealer(self):
+        """ plays out the dealer's one hand for the whole table """
+
+        if self.dealer_needed():
+            while self.dealer.should_hit():
+                self.dealer.deal_card(self.dealer)
+
+    def settle(self):
+        """ Settles every seat against the dealer's hand.
+
+        OUTPUT: list with one list of HandResult per seat
+
+        """
+
+        dealer_hand = self.dealer.curr_hand
+        payouts = self.dealer.rules.payouts
+        return [settle(player.hands, dealer_hand, payouts) for player in self.seats]
+
+    def play_round(self, strategy):
+        """ Plays out a round that has been bet and dealt, with every seat
+        using the strategy.
+
+        OUTPUT: list with one list of HandResult per seat
+
+        """
+
+        if not self.dealer.has_blackjack():
+            for player in self.seats:
+                if not player.has_blackjack():
+                    blackjack_sim.play_hands(self.dealer, player, strategy)
+            self.play_dealer()
+        return self.settle()
+
+
+def simulate_table(strategy, rounds, seats, bet=1, seed=None):
+    """ Plays rounds at a full table with every seat using the same strategy.
+
+    INPUT: strategy callable, number of rounds (int), number of seats,
+    opening bet per seat, optional seed
+    OUTPUT: blackjack_sim.SimulationResult counting every seat's round
+
+    """
+
+    table = Table(seats, blackjack.Dealer(Random(seed)))
+    table.dealer.new_deck()
+    result = blackjack_sim.SimulationResult()
+
+    for _ in range(rounds):
+        table.place_bets([bet] * seats)
+        opening_bets = []
+        for player in table.seats:
+            opening_bets.append(player.curr_hand.bet)
+            player.wallet = player.rules.wallet_needed(player.curr_hand.bet)
+        table.deal()
+        opening_types = [hand_type(player.curr_hand) for player in table.seats]
+        for opening_bet, results, opening_type in zip(opening_bets, table.play_round(strategy), opening_types):
+            result.add_results(opening_bet, results, opening_type)
+        table.dealer.end_round()
+    return result
@@ -0,0 +1,253 @@
+""" Vectorized batch simulation
+
+Deals and resolves thousands of independent rounds at once with NumPy
+arrays instead of Dealer, Player and Hand objects. Hands are kept as
+states from blackjack_handstate, so every draw for a whole batch is one
+fancy index into the transition table.
+
+Each round is dealt from its own freshly shuffled shoe, in the table
+order of blackjack_table.Table.deal() and blackjack_sim.play_round(): a
+card to the player, the upcard, the player's second card and the hole
+card, then the player's and the dealer's draws. Strategies are
+fixed tables compiled from any blackjack_sim strategy; splits aren't
+supported in batch mode, so pairs are played as their total.
+
+crosscheck() replays the exact cards of a batch through
+blackjack_sim.play_round() to confirm both paths apply the same rules.
+
+This module needs NumPy.
+
+"""
+
+import numpy as np
+
+import blackjack
+import blackjack_handstate as handstate
+import blackjack_sim
+from blackjack_rules import VEGAS_STRIP
+from blackjack_settlement import Outcome
+from blackjack_sim import SimulationResult, STAND, HIT, DOUBLE
+
+MAX_CARDS = 32 # more cards than any unsplit round can use
+
+_TRANSITIONS = np.array(handstate.TRANSITIONS, dtype=np.int32)
+_TOTAL = np.array(handstate.TOTAL, dtype=np.int32)
+_VALUES = np.array([card.value for card in blackjack.CardDeck().cards], dtype=np.int32)
+
+_STAND = 0
+_HIT = 1
+_DOUBLE = 2
+_CODES = {STAND: _STAND, HIT: _HIT, DOUBLE: _DOUBLE}
+
+OUTCOMES = tuple(outcome.value for outcome in Outcome)
+
+_rule_arrays = {} # Rules -> arrays of its tables, see rule_arrays()
+
+
+def rule_arrays(rules):
+    """ The tables of a blackjack_rules.Rules as arrays, built once per rules object.
+
+    OUTPUT: tuple of (dealer hits by state, net result per unit bet by
+    outcome index)
+
+    """
+
+    if rules not in _rule_arrays:
+        _rule_arrays[rules] = (np.array(rules.dealer_hits),
+                               np.array([rules.payouts[outcome] - 1 for outcome in Outcome]))
+    return _rule_arrays[rules]
+
+
+def compile_strategy(strategy):
+    """ Turns a blackjack_sim strategy into lookup arrays for batch play.
+
+    The strategy is asked once for every hand state and upcard, with
+    splitting never allowed.
+
+    OUTPUT: int8 array indexed [can_double_down, state, upcard]
+
+    """
+
+    actions = np.zeros((2, len(handstate.TOTAL), 11), dtype=np.int8)
+    hand = handstate.FastHand()
+    for state in range(len(handstate.TOTAL)):
+        if state & handstate.BUST or handstate.TOTAL[state] >= 21:
+            continue
+        hand.state = state
+        for upcard in range(1, 11):
+            card = blackjack.Card('', upcard)
+            for can_double_down in (False, True):
+                if can_double_down and handstate.COUNT[state] != 2:
+                    continue
+                action = strategy(hand, card, can_double_down, False)
+                if action not in _CODES:
+                    raise ValueError(f"batch mode can't play action {action!r}")
+                actions[int(can_double_down), state, upcard] = _CODES[action]
+    return actions
+
+class Shoes():
+    """One freshly shuffled shoe for each of a batch of rounds.
+
+    The shoes are stored one card position per row, so dealing the next
+    card to a set of lanes touches a single row. Cards are shuffled lazily:
+    each draw is one step of a Fisher-Yates shuffle, so only the cards that
+    are actually dealt are ever shuffled. A lane that has dealt its whole
+    shoe gets a fresh one, as Dealer.deal_card() brings in a new deck.
+
+    """
+
+    def __init__(self, rng, rounds, record=False, shoe=blackjack.CardDeck.shoe):
+        shoe = np.frombuffer(shoe, dtype=np.uint8)
+        self.rng = rng
+        self.rounds = rounds
+        self.size = len(shoe)
+        self.cards = np.repeat(shoe[:, None], rounds, axis=1)
+        self.flat = self.cards.reshape(-1)
+        self.position = np.zeros(rounds, dtype=np.int64)
+        # the codes dealt to each round, in order, when asked to keep them
+        self.dealt = np.zeros((rounds, MAX_CARDS), dtype=np.uint8) if record else None
+
+    def draw(self, lanes):
+        """ deals the next card of every lane given
+
+        OUTPUT: array of card values
+
+        """
+
+        position = self.position[lanes]
+        position[position >= self.size] = 0 # out of cards, a new shoe is brought in
+        left = self.size - position
+        chosen = position + (self.rng.random(len(lanes)) * left).astype(np.int64)
+        swap = chosen * self.rounds + lanes
+        top = position * self.rounds + lanes
+        card = self.flat[swap]
+        self.flat[swap] = self.flat[top]
+        self.flat[top] = card
+        if self.dealt is not None:
+            self.dealt[lanes, position] = card
+        self.position[lanes] = position + 1
+        return _VALUES[card]
+
+def play_rounds(rng, rounds, actions, bet=1, record=False, rules=None):
+    """ Deals and plays a batch of rounds in lockstep, each from its own shoe.
+
+    INPUT: numpy Generator, number of rounds, compiled strategy, opening
+    bet, whether to keep the cards dealt to each round, blackjack_rules.Rules
+    (the Vegas Strip rules if None)
+    OUTPUT: tuple of arrays (amount wagered, net result, outcome index into
+    OUTCOMES, cards dealt or None)
+
+    """
+
+    rules = rules or VEGAS_STRIP
+    dealer_hits, net = rule_arrays(rules)
+    shoes = Shoes(rng, rounds, record, rules.shoe)
+    lanes = np.arange(rounds)
+
+    player = _TRANSITIONS[handstate.EMPTY * 11 + shoes.draw(lanes)]
+    upcard = shoes.draw(lanes)
+    player = _TRANSITIONS[player * 11 + shoes.draw(lanes)]
+    dealer = _TRANSITIONS[handstate.EMPTY * 11 + upcard]
+    dealer = _TRANSITIONS[dealer * 11 + shoes.draw(lanes)]
+    bets = np.full(rounds, bet, dtype=np.float64)
+
+    player_blackjack = (player & handstate.BLACKJACK) != 0
+    dealer_blackjack = (dealer & handstate.BLACKJACK) != 0
+    decided = player_blackjack | (dealer_blackjack & (upcard == 1)) # the peek
+
+    # player's turn: every lane that is still deciding takes one step per pass
+    active = ~decided & (_TOTAL[player] < 21)
+    can_double_down = active.astype(np.int64)
+    while active.any():
+        index = lanes[active]
+        action = actions[can_double_down[index], player[index], upcard[index]]
+
+        draw = index[action != _STAND]
+        player[draw] = _TRANSITIONS[player[draw] * 11 + shoes.draw(draw)]
+
+        doubled = index[action == _DOUBLE]
+        bets[doubled] *= 2
+        active[index[action == _STAND]] = False
+        active[doubled] = False
+        active[draw] &= _TOTAL[player[draw]] < 21
+        can_double_down[index] = 0
+
+    # dealer's turn, skipped when the round is decided or the player is bust
+    player_bust = (player & handstate.BUST) != 0
+    active = ~decided & ~player_bust & dealer_hits[dealer]
+    while active.any():
+        index = lanes[active]
+        dealer[index] = _TRANSITIONS[dealer[index] * 11 + shoes.draw(index)]
+        active[index] = dealer_hits[dealer[index]]
+
+    # settlement, with the same precedence as blackjack_settlement.hand_outcome()
+    player_total = _TOTAL[player]
+    dealer_total = _TOTAL[dealer]
+    dealer_bust = (dealer & handstate.BUST) != 0
+    outcome = np.select(
+        [dealer_blackjack & player_blackjack,
+         dealer_blackjack,
+         player_blackjack,
+         player_bust,
+         dealer_bust | (player_total > dealer_total),
+         player_total == dealer_total],
+        [2, 3, 0, 3, 1, 2],
+        default=3)
+    return bets, bets * net[outcome], outcome, shoes.dealt
+
+def simulate(strategy, rounds, bet=1, seed=None, batch=10000, rules=None, precision=None,
+             confidence=0.95):
+    """ Plays rounds in batches of independent shoes.
+
+    With a precision the run stops after the first batch that brings the
+    confidence interval on the house edge down to that width.
+
+    INPUT: strategy callable or actions from compile_strategy(), number of
+    rounds, opening bet, seed, rounds per batch, blackjack_rules.Rules,
+    optional width of confidence interval to stop at, its confidence level
+    OUTPUT: blackjack_sim.SimulationResult
+
+    """
+
+    actions = strategy if isinstance(strategy, np.ndarray) else compile_strategy(strategy)
+    rng = np.random.default_rng(seed)
+    result = SimulationResult()
+    for start in range(0, rounds, batch):
+        wagered, net, outcome, _ = play_rounds(rng, min(batch, rounds - start), actions, bet, rules=rules)
+        result.rounds += len(net)
+        result.initial_bets += bet * len(net)
+        result.wagered += float(wagered.sum())
+        result.net += float(net.sum())
+        per_unit = net / bet
+        mean = float(per_unit.mean())
+        result.per_unit.add_batch(len(per_unit), mean, float(((per_unit - mean) ** 2).sum()))
+        for index, count in enumerate(np.bincount(outcome, minlength=len(OUTCOMES))):
+            result.outcomes[OUTCOMES[index]] += int(count)
+        if precision is not None and result.precise_enough(precision, confidence):
+            break
+    return result
+
+def crosscheck(strategy, rounds=10000, seed=0, rules=None):
+    """ Plays the same shoes through the batch path and through
+    blackjack_sim.play_round() and compares every round.
+
+    OUTPUT: list of the indexes of rounds whose results differ
+
+    """
+
+    def no_split(hand, upcard, can_double_down, can_split):
+        return strategy(hand, upcard, can_double_down, False)
+
+    rng = np.random.default_rng(seed)
+    wagered, net, _, cards = play_rounds(rng, rounds, compile_strategy(strategy), record=True, rules=rules)
+
+    dealer = blackjack.Dealer(rules=rules)
+    player = blackjack.Player(dealer.rules)
+    dealer.new_deck()
+    mismatches = []
+    for index, row in enumerate(cards):
+        dealer.deck.deck[:] = bytes(row[::-1]) # get_card() deals from the end
+        _, scalar_wagered, scalar_net, _ = blackjack_sim.play_round(dealer, player, no_split)
+        if scalar_wagered != wagered[index] or scalar_net != net[index]:
+            mismatches.append(index)
+    return mismatches
@@ -0,0 +1,13 @@
+""" Helpers shared by the tests """
+
+import blackjack
+
+
+def hand(values, split=False, surrendered=False, bet=10):
+    """ a Hand holding cards of the given values """
+
+    hand = blackjack.Hand(bet, split)
+    for value in values:
+        hand.add_card(blackjack.Card('', value))
+    hand.surrendered = surrendered
+    return hand
@@ -0,0 +1,23 @@
+""" Both sides of a comparison must play the rules and shoes asked for """
+
+import pytest
+
+import blackjack
+from blackjack_abtest import compare
+from blackjack_rules import Rules
+from blackjack_sim import basic_strategy, dealer_strategy
+
+
+def test_sides_see_the_same_opening_cards():
+    result = compare(basic_strategy, dealer_strategy, 2000, seed=0)
+    assert result.rounds == 2000
+    assert result.a.hand_types.keys() == result.b.hand_types.keys()
+    for hand_type, stats in result.a.hand_types.items():
+        assert stats.count == result.b.hand_types[hand_type].count
+
+@pytest.mark.parametrize('dealer', [blackjack.Dealer(penetration=0.5),
+                                    blackjack.Dealer(rules=Rules(decks=2))],
+                         ids=['penetration', 'rules'])
+def test_mismatched_dealers_are_refused(dealer):
+    with pytest.raises(ValueError):
+        compare(basic_strategy, basic_strategy, 10, dealers=(dealer, blackjack.Dealer()))
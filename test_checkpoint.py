@@ -0,0 +1,55 @@
+""" Checkpointed runs must resume exactly, and only as the run that wrote them """
+
+import pytest
+
+import blackjack
+import blackjack_sim
+from blackjack_sim import basic_strategy, dealer_strategy
+
+
+def summary(result):
+    return (result.rounds, result.net, result.wagered, result.per_unit.mean, result.per_unit.m2,
+            dict(result.outcomes))
+
+def test_resume_is_bit_identical(tmp_path, monkeypatch):
+    path = tmp_path / 'run.ckpt'
+    full = blackjack_sim.simulate(basic_strategy, 6000, seed=5)
+
+    monkeypatch.setattr(blackjack_sim, 'CHECKPOINT_SECONDS', 0)
+    calls = 0
+    def dying(*args):
+        nonlocal calls
+        calls += 1
+        if calls == 5000:
+            raise KeyboardInterrupt
+        return basic_strategy(*args)
+    dying.__module__, dying.__qualname__ = basic_strategy.__module__, basic_strategy.__qualname__
+    with pytest.raises(KeyboardInterrupt):
+        blackjack_sim.simulate(dying, 6000, seed=5, checkpoint=path)
+
+    resumed = blackjack_sim.simulate(basic_strategy, 6000, checkpoint=path, resume=True)
+    assert summary(resumed) == summary(full)
+
+@pytest.mark.parametrize('changes', [{'bet': 2}, {'strategy': dealer_strategy},
+                                     {'dealer': blackjack.Dealer(penetration=0.5)},
+                                     {'dealer': blackjack.Dealer(continuous=True)}],
+                         ids=['bet', 'strategy', 'penetration', 'continuous'])
+def test_resume_rejects_another_run(tmp_path, changes):
+    path = tmp_path / 'run.ckpt'
+    blackjack_sim.simulate(basic_strategy, 1000, seed=1, checkpoint=path)
+    run = dict(strategy=basic_strategy, rounds=2000, bet=1, checkpoint=path, resume=True)
+    run.update(changes)
+    with pytest.raises(ValueError):
+        blackjack_sim.simulate(**run)
+
+def test_parallel_resume_rejects_other_shards(tmp_path, monkeypatch):
+    path = tmp_path / 'run.ckpt'
+    monkeypatch.setattr(blackjack_sim, 'SHARD_ROUNDS', 1000)
+    blackjack_sim.simulate_parallel(basic_strategy, 1500, seed=1, workers=1, checkpoint=path)
+    with pytest.raises(ValueError):
+        blackjack_sim.simulate_parallel(basic_strategy, 2500, seed=1, workers=1, checkpoint=path, resume=True)
+    with pytest.raises(ValueError):
+        blackjack_sim.simulate_parallel(dealer_strategy, 1500, seed=1, workers=1, checkpoint=path, resume=True)
+    resumed = blackjack_sim.simulate_parallel(basic_strategy, 1500, seed=1, workers=1, checkpoint=path,
+                                              resume=True)
+    assert resumed.rounds == 1500
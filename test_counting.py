@@ -0,0 +1,40 @@
+""" The count must only include cards the player has seen """
+
+import blackjack
+from blackjack_counting import CountTracker, HI_LO
+
+
+def deal(dealer, codes, to):
+    """ deals cards with the given codes, in order, to the given hands """
+    dealer.deck.deck[:] = bytes(reversed(codes)) # get_card() deals from the end
+    for player_dealer in to:
+        dealer.deal_card(player_dealer)
+
+def test_hole_card_is_counted_once_shown():
+    dealer = blackjack.Dealer()
+    player = blackjack.Player()
+    dealer.new_deck()
+    tracker = CountTracker()
+    tracker.attach(dealer, player)
+    player.place_bet(1)
+
+    # player 2 and 3, dealer 5 up and an ace in the hole (codes are ace = 0 to king = 12)
+    deal(dealer, [1, 2, 4, 0], [player, player, dealer, dealer])
+    assert tracker.running_count == 3
+    assert tracker.cards_seen == 3
+
+    dealer.discard_hand() # the round is over and the hole card has been seen
+    assert tracker.running_count == 3 + HI_LO[1]
+    assert tracker.cards_seen == 4
+
+def test_hole_card_is_counted_when_the_dealer_draws():
+    dealer = blackjack.Dealer()
+    player = blackjack.Player()
+    dealer.new_deck()
+    tracker = CountTracker()
+    tracker.attach(dealer, player)
+    player.place_bet(1)
+
+    deal(dealer, [9, 8, 4, 1, 2], [player, player, dealer, dealer, dealer])
+    assert tracker.running_count == -1 + 0 + 1 + 1 + 1
+    assert tracker.cards_seen == 5
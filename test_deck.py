@@ -0,0 +1,39 @@
+""" The shoe must be cut where the penetration says and never lose a card """
+
+import blackjack
+from blackjack_rules import Rules
+
+
+def deal(dealer, player, cards):
+    """ deals a number of cards to the player """
+    for _ in range(cards):
+        dealer.deal_card(player)
+
+def test_reshuffle_at_the_cut_card():
+    dealer = blackjack.Dealer(penetration=0.5, rules=Rules(decks=1))
+    player = blackjack.Player()
+    player.place_bet(1)
+    dealer.new_deck()
+    assert dealer.deck.cut_card == 26
+
+    deal(dealer, player, 25)
+    assert not dealer.deck.needs_shuffle()
+    assert not dealer.end_round()
+    deal(dealer, player, 1)
+    assert dealer.deck.needs_shuffle()
+    assert dealer.end_round()
+    assert len(dealer.deck.deck) == 52
+
+def test_continuous_shoe_stays_whole():
+    dealer = blackjack.Dealer(continuous=True, rules=Rules(decks=2))
+    player = blackjack.Player()
+    dealer.new_deck()
+    full = sorted(dealer.deck.shoe)
+    for _ in range(50):
+        player.discard_hands()
+        player.place_bet(1)
+        deal(dealer, player, 7)
+        assert sorted(dealer.deck.deck + dealer.deck.dealt) == full
+        assert not dealer.end_round()
+        assert sorted(dealer.deck.deck) == full
+        assert not dealer.deck.dealt
@@ -0,0 +1,26 @@
+""" The environment must keep dealing whatever the shoe and the actions taken """
+
+import pytest
+
+np = pytest.importorskip('numpy') # the environment is optional, as NumPy is
+
+from blackjack_env import A_SPLIT, VectorEnv # noqa: E402
+from blackjack_rules import Rules # noqa: E402
+
+
+@pytest.mark.parametrize('penetration', [0.75, 1.0])
+def test_single_deck_random_actions_never_run_out_of_cards(penetration):
+    env = VectorEnv(4096, seed=1, rules=Rules(decks=1), penetration=penetration)
+    rng = np.random.default_rng(1)
+    _, masks = env.reset()
+    splits = 0
+    for _ in range(200):
+        # pick uniformly among the legal actions of each table
+        actions = (rng.random(masks.shape) * masks).argmax(axis=1)
+        splits += int((actions == A_SPLIT).sum())
+        observations, rewards, dones, masks = env.step(actions)
+        assert masks.any(axis=1).all()
+        assert (observations[:, 0] < 21).all()
+    assert splits
+    assert (env.shoes.position <= env.shoes.size).all()
+    assert env.rounds > 4096
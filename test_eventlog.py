@@ -0,0 +1,61 @@
+""" A session logged by the game loop must read back whole, and the log must
+let go of the dealer once the session or simulation is over
+
+"""
+
+from random import Random
+
+import blackjack
+import blackjack_eventlog as eventlog
+import blackjack_gameloop
+import blackjack_sim
+from blackjack_sim import basic_strategy
+
+
+def play_session(path):
+    """ plays a short scripted session into a new log and returns its events """
+
+    log = eventlog.EventLog(path)
+    blackjack_gameloop.run(['1'] * 40, log=log, quiet=True)
+    log.close()
+    return list(eventlog.read_events(path))
+
+def test_session_reads_back(tmp_path):
+    path = tmp_path / 'session.log'
+    events = play_session(path)
+
+    assert events[0].kind == eventlog.SEED
+    assert events[0].value % 2 ** 64 == blackjack_gameloop.SEED
+    summary = eventlog.summarize(path)
+    assert summary['rounds'] >= 1
+    assert summary['cards'] == sum(event.kind == eventlog.DEAL for event in events)
+    assert summary['hands'] == sum(event.kind == eventlog.SETTLE for event in events)
+    assert len(list(eventlog.read_rounds(path))) == summary['rounds']
+
+def test_torn_last_record_is_ignored(tmp_path):
+    path = tmp_path / 'session.log'
+    events = play_session(path)
+
+    with open(path, 'ab') as file:
+        file.write(eventlog.RECORD.pack(eventlog.DEAL, 0, 0, 1, 1, 0)[:7]) # a crash mid write
+    assert list(eventlog.read_events(path)) == events
+
+def test_log_is_detached_when_the_game_stops(tmp_path):
+    first = tmp_path / 'first.log'
+    second = tmp_path / 'second.log'
+    play_session(first)
+    cards = eventlog.summarize(first)['cards']
+
+    play_session(second) # would write to the closed first log if it were still attached
+    blackjack_gameloop.run(['1'] * 40, quiet=True)
+    assert eventlog.summarize(first)['cards'] == cards
+    assert not blackjack_gameloop.DEALER.observers
+
+def test_simulation_detaches_the_log(tmp_path):
+    dealer = blackjack.Dealer(Random(0))
+    log = eventlog.EventLog(tmp_path / 'run.log')
+    blackjack_sim.simulate(basic_strategy, 20, dealer=dealer, seed=0, log=log)
+    log.close()
+
+    assert not dealer.observers
+    blackjack_sim.simulate(basic_strategy, 20, dealer=dealer) # must not write to the closed log
@@ -0,0 +1,136 @@
+""" Importing the game loop must be quick and free of side effects """
+
+import os
+import subprocess
+import sys
+from time import perf_counter
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STARTUP_BUDGET = 1.0 # seconds for a new interpreter to import the game loop and exit
+
+
+def test_import_has_no_side_effects_and_starts_quickly():
+    code = "import blackjack_gameloop; assert blackjack_gameloop.TABLE is None"
+    timings = []
+    for _ in range(3):
+        start = perf_counter()
+        process = subprocess.run([sys.executable, '-c', code], cwd=HERE, stdin=subprocess.DEVNULL,
+                                 capture_output=True, timeout=30)
+        timings.append(perf_counter() - start)
+        assert process.returncode == 0, process.stderr.decode()
+        assert process.stdout == b''
+        assert process.stderr == b''
+    assert min(timings) < STARTUP_BUDGET
+
+def test_scripted_run_restores_input_pauses_and_quiet_mode():
+    import blackjack_gameloop
+
+    blackjack_gameloop.run(['1', '1', '1', '1', '1'], quiet=True)
+    assert blackjack_gameloop.read_input is input
+    assert blackjack_gameloop.PAUSES
+    assert blackjack_gameloop.LOG is None
+    assert not blackjack_gameloop.QUIET
+
+def new_table(monkeypatch, rules=None):
+    """ sets up a fresh table for one test, put back as it was afterwards """
+
+    import blackjack_gameloop
+
+    for name in ('TABLE', 'DEALER', 'PLAYER', 'SEED'):
+        monkeypatch.setattr(blackjack_gameloop, name, None)
+    blackjack_gameloop.setup(rules=rules, seed=0)
+
+def deal_hand(monkeypatch, codes, answers, rules=None):
+    """ sets up a fresh table, deals the first four card codes to the player,
+    player, dealer and dealer and leaves the rest to be drawn, with answers
+    scripted
+
+    """
+
+    import blackjack_gameloop
+
+    answers = iter(answers)
+    new_table(monkeypatch, rules)
+    monkeypatch.setattr(blackjack_gameloop, 'read_input', lambda prompt: next(answers))
+    monkeypatch.setattr(blackjack_gameloop, 'QUIET', True)
+    dealer = blackjack_gameloop.DEALER
+    player = blackjack_gameloop.PLAYER
+    dealer.new_deck()
+    player.place_bet(10)
+    dealer.deck.deck[:] = bytes(reversed(codes)) # get_card() deals from the end
+    for player_dealer in (player, player, dealer, dealer):
+        dealer.deal_card(player_dealer)
+    return player, answers
+
+def test_split_aces_take_one_card_each(monkeypatch):
+    import blackjack_gameloop
+
+    # ace, ace against a 6 with a 9 in the hole, then a 5 and a 4 to the split aces
+    player, answers = deal_hand(monkeypatch, [0, 0, 5, 8, 4, 3], ['4', '2', '2'])
+    blackjack_gameloop.play_hand()
+    blackjack_gameloop.set_next_hand()
+    blackjack_gameloop.play_hand()
+    assert [len(hand.cards) for hand in player.hands] == [2, 2]
+    assert next(answers) == '2' # no hit was asked for on a split ace
+
+def test_surrender_follows_the_table_rules(monkeypatch):
+    import blackjack_gameloop
+    from blackjack_rules import Rules
+
+    # 10, 6 against a 10 with a 7 in the hole
+    player, _ = deal_hand(monkeypatch, [9, 5, 9, 6], ['5'], Rules(surrender=True))
+    blackjack_gameloop.play_hand()
+    assert player.curr_hand.surrendered
+
+    player, _ = deal_hand(monkeypatch, [9, 5, 9, 6], ['5', '1'])
+    blackjack_gameloop.play_hand()
+    assert not player.curr_hand.surrendered
+
+def test_empty_answer_to_a_bet_is_asked_again(monkeypatch):
+    import blackjack_gameloop
+
+    new_table(monkeypatch)
+    blackjack_gameloop.PLAYER.wallet = 3
+    blackjack_gameloop.run(['1', '1', ''], quiet=True)
+    assert blackjack_gameloop.get_valid_bets() == ['1']
+    assert blackjack_gameloop.PLAYER.wallet == 3
+
+def test_no_bet_the_wallet_cannot_cover(monkeypatch):
+    import blackjack_gameloop
+
+    new_table(monkeypatch)
+    blackjack_gameloop.PLAYER.wallet = 0.5
+    blackjack_gameloop.run(['1', '1', '1'], quiet=True)
+    assert blackjack_gameloop.get_valid_bets() is None
+    assert blackjack_gameloop.PLAYER.wallet == 0.5
+
+@pytest.mark.parametrize('seed', range(2, 8))
+def test_running_out_of_input_mid_hand_settles_nothing(monkeypatch, tmp_path, seed):
+    import blackjack_eventlog as eventlog
+    import blackjack_gameloop
+
+    for name in ('TABLE', 'DEALER', 'PLAYER', 'SEED'):
+        monkeypatch.setattr(blackjack_gameloop, name, None)
+    path = tmp_path / 'session.log'
+    log = eventlog.EventLog(path)
+    blackjack_gameloop.run(['1', '1', '10'], log=log, quiet=True, seed=seed)
+    log.close()
+    events = list(eventlog.read_events(path))
+    if blackjack_gameloop.PLAYER.has_blackjack() or blackjack_gameloop.DEALER.has_blackjack():
+        return # the round needed no decision
+    assert not any(event.kind == eventlog.SETTLE for event in events)
+
+def test_strategy_stop_iteration_is_not_taken_for_the_end_of_the_hand():
+    import blackjack
+    from blackjack_sim import play_round
+
+    def exhausted(hand, upcard, can_double_down, can_split):
+        raise StopIteration
+
+    dealer = blackjack.Dealer()
+    dealer.new_deck()
+    dealer.deck.deck[:] = bytes([9, 5, 9, 6]) * 10 # 7, 6 against a 10 up, 10 in the hole, every round
+    with pytest.raises(StopIteration):
+        play_round(dealer, blackjack.Player(), exhausted)
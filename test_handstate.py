@@ -0,0 +1,44 @@
+""" Hand states must agree with totals worked out the slow way """
+
+from random import Random
+
+import blackjack_handstate as handstate
+from conftest import hand
+
+VALUES = [min(rank, 10) for rank in range(1, 14)] # ace to king
+
+
+def naive(values, split=False):
+    """ (total, soft, bust, blackjack, pair) of a hand, counted card by card """
+
+    total = sum(values)
+    soft = 1 in values and total + 10 <= 21
+    if soft:
+        total += 10
+    return (total, soft, total > 21, total == 21 and len(values) == 2 and not split,
+            len(values) == 2 and values[0] == values[1])
+
+def test_random_hands_match_naive_totals():
+    rng = Random(0)
+    for _ in range(100000):
+        split = rng.random() < 0.25
+        values = [rng.choice(VALUES) for _ in range(rng.randint(1, 8))]
+        total, soft, bust, natural, pair = naive(values, split)
+        played = hand(values, split)
+        assert played.is_bust() == bust, values
+        if not bust:
+            assert (played.value, played.is_soft) == (total, soft), values
+        assert played.is_blackjack() == natural, values
+        assert played.is_splitable() == pair, values
+        assert played.is_split == split, values
+
+def test_ace_on_soft_21_is_counted_as_one():
+    assert hand([1, 10]).value == 21
+    played = hand([1, 10, 1])
+    assert (played.value, played.is_soft, played.is_bust()) == (12, False, False)
+    played = hand([1, 5, 5, 1])
+    assert (played.value, played.is_soft, played.is_bust()) == (12, False, False)
+
+def test_split_hand_21_is_not_blackjack():
+    assert not hand([1, 10], split=True).is_blackjack()
+    assert handstate.hand_state([10, 1]) & handstate.BLACKJACK
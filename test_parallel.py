@@ -0,0 +1,19 @@
+""" A parallel run must give the same result whatever the number of workers """
+
+import blackjack_sim
+from blackjack_sim import basic_strategy
+
+
+def summary(result):
+    return (result.rounds, result.net, result.wagered, result.per_unit.mean, result.per_unit.m2,
+            dict(result.outcomes))
+
+def test_same_seed_same_result_for_any_worker_count(monkeypatch):
+    monkeypatch.setattr(blackjack_sim, 'SHARD_ROUNDS', 500)
+    results = [blackjack_sim.simulate_parallel(basic_strategy, 2600, seed=7, workers=workers)
+               for workers in (1, 3)]
+    assert summary(results[0]) == summary(results[1])
+    assert results[0].rounds == 2600
+
+    other = blackjack_sim.simulate_parallel(basic_strategy, 2600, seed=8, workers=1)
+    assert summary(other) != summary(results[0])
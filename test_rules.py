@@ -0,0 +1,76 @@
+""" The compiled rule tables must say what the options say """
+
+import pytest
+
+import blackjack
+from blackjack_handstate import hand_state
+from blackjack_rules import Rules, VEGAS_STRIP
+from blackjack_sim import DOUBLE, SPLIT, STAND, play_round
+
+
+def test_aces_split_only_once():
+    assert VEGAS_STRIP.can_split[1][1]
+    assert not VEGAS_STRIP.can_split[2][1]
+    assert VEGAS_STRIP.can_split[2][8]
+    assert VEGAS_STRIP.can_split[3][8]
+
+@pytest.mark.parametrize('max_hands', [1, 2, 4, 8])
+def test_split_stops_at_max_hands(max_hands):
+    rules = Rules(max_hands=max_hands)
+    for hands in range(1, max_hands + 1):
+        assert rules.can_split[hands][8] == (hands < max_hands)
+
+def test_double_after_split():
+    for rules, after_split in ((Rules(double_after_split=True), True),
+                               (Rules(double_after_split=False), False)):
+        assert rules.can_double[hand_state([5, 6])]
+        assert rules.can_double[hand_state([5, 6], split=True)] == after_split
+        assert not rules.can_double[hand_state([2, 3, 6])]
+
+def test_surrender_on_first_two_cards_of_an_unsplit_hand():
+    rules = Rules(surrender=True)
+    assert rules.can_surrender[hand_state([10, 6])]
+    assert not rules.can_surrender[hand_state([10, 6], split=True)]
+    assert not rules.can_surrender[hand_state([10, 3, 3])]
+    assert not VEGAS_STRIP.can_surrender[hand_state([10, 6])]
+
+@pytest.mark.parametrize('values, s17_hits, h17_hits', [
+    ([10, 6], True, True),
+    ([1, 6], False, True),
+    ([1, 2, 4], False, True),
+    ([10, 7], False, False),
+    ([1, 7], False, False),
+    ([1, 6, 10], False, False), # hard 17
+    ])
+def test_dealer_hits(values, s17_hits, h17_hits):
+    state = hand_state(values)
+    assert VEGAS_STRIP.dealer_hits[state] == s17_hits
+    assert Rules(hit_soft_17=True).dealer_hits[state] == h17_hits
+
+def test_wallet_covers_every_split_and_double():
+    rules = Rules(max_hands=8)
+    dealer = blackjack.Dealer(rules=rules)
+    dealer.new_deck()
+    dealer.deck.deck[:] = bytes([7]) * 40 # nothing but eights
+    player = blackjack.Player(rules)
+
+    def split_then_double(hand, upcard, can_double_down, can_split):
+        if can_split:
+            return SPLIT
+        return DOUBLE if can_double_down else STAND
+
+    _, wagered, net, _ = play_round(dealer, player, split_then_double)
+    assert len(player.hands) == 8
+    assert all(hand.bet == 2 for hand in player.hands)
+    assert player.wallet == 0
+    assert (wagered, net) == (16, -16)
+
+def test_split_needs_the_wallet_to_match_the_bet():
+    player = blackjack.Player()
+    player.place_bet(10)
+    for value in (8, 8):
+        player.curr_hand.add_card(blackjack.Card('', value))
+    player.wallet = 9
+    assert not player.can_split()
+    player.wallet = 10
+    assert player.can_split()
@@ -0,0 +1,32 @@
+""" The server must survive bad input and play hands by the shared rules """
+
+import asyncio
+
+import blackjack_server
+
+
+async def converse(lines):
+    """ sends lines to a fresh server and returns everything it sent back """
+
+    server = blackjack_server.Server(seed=1)
+    listener = await asyncio.start_server(server.handle, '127.0.0.1', 0, limit=2 ** 12)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for line in lines:
+            writer.write(line)
+        await writer.drain()
+        writer.write_eof() # the session ends when the input does
+        received = await asyncio.wait_for(reader.read(), timeout=10)
+        writer.close()
+    return received
+
+def test_undecodable_and_overlong_lines_are_asked_again():
+    received = asyncio.run(converse([b'\xff\xfe\n', b'x' * 10000 + b'\n', b'q\n']))
+    assert received.endswith(b'bye\n')
+    assert received.count(b'? bet') >= 3
+
+def test_hands_are_played_to_settlement():
+    received = asyncio.run(converse([b'1\n'] + [b'1\n'] * 20 + [b'q\n']))
+    assert b'Hand 1: ' in received
+    assert received.endswith(b'bye\n')
@@ -0,0 +1,38 @@
+""" Every player hand must settle to the right Outcome and amount """
+
+import pytest
+
+from blackjack_rules import Rules
+from blackjack_settlement import Outcome, settle
+from conftest import hand
+
+
+CASES = [
+    # player hand, dealer hand, outcome, net result of a 10 bet
+    (hand([1, 10]), hand([10, 1]), Outcome.PUSH, 0),
+    (hand([1, 10]), hand([10, 10]), Outcome.BLACKJACK, 15),
+    (hand([10, 9]), hand([10, 1]), Outcome.LOSE, -10),
+    (hand([10, 6], surrendered=True), hand([10, 1]), Outcome.LOSE, -10),
+    (hand([10, 6], surrendered=True), hand([10, 10]), Outcome.SURRENDER, -5),
+    (hand([10, 6, 10]), hand([10, 6, 10]), Outcome.LOSE, -10),
+    (hand([10, 5]), hand([10, 6, 10]), Outcome.WIN, 10),
+    (hand([10, 10]), hand([10, 9]), Outcome.WIN, 10),
+    (hand([10, 8]), hand([10, 8]), Outcome.PUSH, 0),
+    (hand([10, 7]), hand([10, 9]), Outcome.LOSE, -10),
+    (hand([1, 10], split=True), hand([10, 10]), Outcome.WIN, 10),
+    (hand([1, 10], split=True), hand([10, 1]), Outcome.LOSE, -10),
+    (hand([1, 10], split=True), hand([10, 5, 6]), Outcome.PUSH, 0),
+    (hand([5, 6, 10], bet=20), hand([10, 10]), Outcome.WIN, 20),
+    ]
+
+@pytest.mark.parametrize('player, dealer, outcome, net', CASES)
+def test_settle(player, dealer, outcome, net):
+    [result] = settle([player], dealer)
+    assert result.outcome == outcome
+    assert result.bet == player.bet
+    assert result.net == net
+
+def test_settle_uses_the_table_payouts():
+    results = settle([hand([1, 10]), hand([10, 10])], hand([10, 9]), Rules(blackjack_pays=1.2).payouts)
+    assert [result.outcome for result in results] == [Outcome.BLACKJACK, Outcome.WIN]
+    assert [result.net for result in results] == [pytest.approx(12), 10]
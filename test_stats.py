@@ -0,0 +1,42 @@
+""" Merged statistics must match a single pass over the same values """
+
+from random import Random
+
+import pytest
+
+from blackjack_stats import RunningStats
+
+
+def stats_of(values):
+    """ a RunningStats fed the values one at a time """
+
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    return stats
+
+@pytest.mark.parametrize('sizes', [(1000, 1000), (1, 999), (0, 10), (10, 0), (300, 5, 700)])
+def test_merge_matches_a_single_pass(sizes):
+    rng = Random(0)
+    values = [rng.choice((-2, -1, -0.5, 0, 1, 1.5, 2)) for _ in range(sum(sizes))]
+    merged = RunningStats()
+    start = 0
+    for size in sizes:
+        merged.merge(stats_of(values[start:start + size]))
+        start += size
+
+    single = stats_of(values)
+    assert merged.count == single.count
+    assert merged.mean == pytest.approx(single.mean, abs=1e-12)
+    assert merged.variance == pytest.approx(single.variance, rel=1e-12)
+
+def test_add_batch_takes_a_batch_summary():
+    values = [1.0, -1.0, -1.0, 1.5, 0.0, -1.0]
+    stats = stats_of(values[:2])
+    batch = stats_of(values[2:])
+    stats.add_batch(batch.count, batch.mean, batch.m2)
+
+    single = stats_of(values)
+    assert stats.count == single.count
+    assert stats.mean == pytest.approx(single.mean)
+    assert stats.variance == pytest.approx(single.variance)
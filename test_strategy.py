@@ -0,0 +1,61 @@
+""" The hand written basic strategy must play as the generated table does """
+
+import pytest
+
+import blackjack
+import blackjack_strategy
+from blackjack_rules import Rules
+from blackjack_sim import HIT, SPLIT, STAND, SURRENDER, basic_strategy
+from conftest import hand
+
+
+def test_basic_strategy_matches_the_generated_table(tmp_path, monkeypatch):
+    # build the table afresh and cache it away from the source tree
+    monkeypatch.setattr(blackjack_strategy, '_default_table', None)
+    table = blackjack_strategy.default_table(tmp_path / 'basic_strategy.bin')
+    for first in range(1, 11):
+        for second in range(first, 11):
+            dealt = hand([first, second])
+            if dealt.is_blackjack():
+                continue
+            for up in range(1, 11):
+                upcard = blackjack.Card('', up)
+                for can_double_down in (False, True):
+                    options = (dealt, upcard, can_double_down, first == second)
+                    assert basic_strategy(*options) == table.action(*options), (first, second, up)
+
+def test_table_surrenders_only_where_the_rules_allow():
+    table = blackjack_strategy.rules_table(Rules(surrender=True))
+    ten = blackjack.Card('', 10)
+    sixteen = hand([10, 6])
+    assert table.action(sixteen, ten, True, False) == SURRENDER
+    assert table.action(sixteen, ten, False, False) == SURRENDER
+    assert table.action(hand([10, 6], split=True), ten, True, False) == HIT
+    assert table.action(hand([10, 3, 3]), ten, False, False) == HIT
+    assert table.action(hand([10, 10]), ten, True, False) == STAND
+
+def split_round(pair_value, upcard):
+    """ a Player dealt a pair and a Dealer showing the upcard, their cards
+    taken from a full shoe
+
+    """
+
+    dealer = blackjack.Dealer()
+    dealer.new_deck()
+    player = blackjack.Player()
+    player.place_bet(1)
+    for hand, value in ((player.curr_hand, pair_value), (player.curr_hand, pair_value),
+                        (dealer.curr_hand, upcard), (dealer.curr_hand, 10)):
+        dealer.deck.deck.remove(value - 1) # the code of a card of that value
+        hand.add_card(blackjack.Card('', value))
+    return player, dealer
+
+@pytest.mark.parametrize('pair_value, splits', [(1, True), (8, True), (10, False)])
+def test_split_values_against_a_six(pair_value, splits):
+    values = blackjack_strategy.action_values(*split_round(pair_value, 6))
+    assert (max(values, key=values.get) == SPLIT) == splits
+    assert blackjack_strategy.split_table()[pair_value, 6] == pytest.approx(values[SPLIT])
+
+def test_surrender_loses_the_whole_bet_to_an_unpeeked_blackjack():
+    table = blackjack_strategy.rules_table(Rules(surrender=True))
+    assert table.action(hand([10, 4]), blackjack.Card('', 10), True, False) == HIT
@@ -0,0 +1,40 @@
+""" Every path must deal the cards of a shoe in table order """
+
+import blackjack
+import blackjack_table
+from blackjack_sim import STAND, play_round
+
+CODES = [1, 4, 6, 9] # 2, 5, 7 and 10, dealt in that order
+
+
+def stacked(dealer, codes):
+    """ leaves the codes to be dealt in order, with tens behind them """
+    dealer.new_deck()
+    dealer.deck.deck[:] = bytes([9] * 20 + list(reversed(codes))) # get_card() deals from the end
+
+def values(hand):
+    return [card.value for card in hand.cards]
+
+def test_simulated_round_deals_like_the_table():
+    table = blackjack_table.Table(1)
+    stacked(table.dealer, CODES)
+    table.place_bets([1])
+    table.deal()
+
+    dealer = blackjack.Dealer()
+    player = blackjack.Player()
+    stacked(dealer, CODES)
+    play_round(dealer, player, lambda *options: STAND)
+
+    assert values(player.curr_hand) == values(table.seats[0].curr_hand) == [2, 7]
+    assert values(dealer.curr_hand)[:2] == values(table.dealer.curr_hand) == [5, 10]
+
+def test_table_deals_one_card_a_seat_then_the_dealer_twice():
+    table = blackjack_table.Table(3)
+    # 2 to 9 in order: seats get 2, 3, 4, the dealer 5, then 6, 7, 8 and a 9 in the hole
+    stacked(table.dealer, list(range(1, 9)))
+    table.place_bets([1, 1, 1])
+    table.deal()
+
+    assert [values(player.curr_hand) for player in table.seats] == [[2, 6], [3, 7], [4, 8]]
+    assert values(table.dealer.curr_hand) == [5, 9]
@@ -0,0 +1,16 @@
+""" The batch path must settle every round exactly as blackjack_sim does """
+
+import pytest
+
+pytest.importorskip('numpy') # the batch path is optional, as NumPy is
+
+import blackjack_vector # noqa: E402
+from blackjack_rules import Rules # noqa: E402
+from blackjack_sim import basic_strategy, dealer_strategy # noqa: E402
+
+
+@pytest.mark.parametrize('strategy', [basic_strategy, dealer_strategy])
+@pytest.mark.parametrize('rules', [None, Rules(decks=1, hit_soft_17=True, blackjack_pays=1.2)],
+                         ids=['vegas_strip', 'single_deck_h17_6to5'])
+def test_crosscheck_matches_scalar_rules(strategy, rules):
+    assert blackjack_vector.crosscheck(strategy, 5000, seed=0, rules=rules) == []